@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Cache persistente de canal -> pubkey remoto e pubkey -> alias.
+# Por padrão fica ao lado do script; pode ser sobrescrito pela variável de
+# ambiente ALIAS_CACHE_PATH ou pelo node-status.config.
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_CACHE_PATH = os.environ.get("ALIAS_CACHE_PATH", str(BASE_DIR / "alias_cache.json"))
+
+# Aliases que o LND devolve quando não conhece o nó
+_INVALID_ALIASES = ("", "unknown", "unnamed")
+
+
+def _clean_alias(alias):
+    """Normaliza o alias; retorna None quando não é útil."""
+    alias = (alias or "").strip()
+    lowered = alias.lower()
+    if lowered in _INVALID_ALIASES or lowered.startswith("unable to lookup peeralias"):
+        return None
+    return alias
+
+
+class AliasCache:
+    """
+    Resolve chan_id -> pubkey remoto -> alias sem depender do alias por evento.
+
+    - Canais: preenchido de uma vez com listchannels + closedchannels.
+      Só recarrega quando aparece um chan_id desconhecido (no máximo a cada
+      `channels_min_interval` segundos) ou quando o TTL expira.
+    - Aliases: vêm do listchannels (peer_alias) e, para o que faltar, de
+      getnodeinfo. Entradas vencidas continuam sendo servidas e são
+      renovadas de forma preguiçosa, com limite de chamadas por requisição.
+
+    O estado é gravado em JSON (escrita atômica) para sobreviver a restarts.
+    `run` é a função que executa o lncli (mesma assinatura de run_command).
+    """
+
+    def __init__(self, run, path=DEFAULT_CACHE_PATH, ttl=24 * 3600,
+                 channels_min_interval=300, max_lookups=25):
+        self._run = run
+        self.path = path
+        self.ttl = ttl
+        self.channels_min_interval = channels_min_interval
+        self.max_lookups = max_lookups
+        self._lock = threading.Lock()
+        self._channels = {}      # chan_id -> pubkey
+        self._nodes = {}         # pubkey -> {"alias": str|None, "ts": float}
+        self._channels_ts = 0.0
+        self._channels_attempt_ts = 0.0   # última tentativa (com ou sem sucesso)
+        self._peer_alias_flag = True      # lncli antigo não conhece --peer_alias_lookup
+        self._dirty = False
+        self._load()
+
+    # -----------------------------
+    # Persistência
+    # -----------------------------
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except Exception:
+            return
+        self._channels = {str(k): v for k, v in (data.get("channels") or {}).items()}
+        self._nodes = data.get("nodes") or {}
+        self._channels_ts = float(data.get("channels_ts") or 0.0)
+
+    def _save(self):
+        if not self._dirty:
+            return
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(
+                    {
+                        "channels": self._channels,
+                        "nodes": self._nodes,
+                        "channels_ts": self._channels_ts,
+                    },
+                    f,
+                )
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except Exception:
+            # Cache é otimização: falha de escrita não pode derrubar a rota
+            pass
+
+    # -----------------------------
+    # Preenchimento
+    # -----------------------------
+    def _refresh_channels(self, lncli_cmd):
+        """Recarrega o mapa de canais (abertos e fechados)."""
+        open_data = None
+        if self._peer_alias_flag:
+            try:
+                open_data = json.loads(self._run(lncli_cmd + ['listchannels', '--peer_alias_lookup'], timeout=10))
+            except RuntimeError as e:
+                if 'peer_alias_lookup' not in str(e):
+                    raise
+                self._peer_alias_flag = False
+        if open_data is None:
+            open_data = json.loads(self._run(lncli_cmd + ['listchannels'], timeout=10))
+        closed_data = json.loads(self._run(lncli_cmd + ['closedchannels'], timeout=10))
+        now = time.time()
+
+        for ch in open_data.get("channels", []) or []:
+            chan_id = str(ch.get("chan_id") or "")
+            pubkey = ch.get("remote_pubkey")
+            if not chan_id or not pubkey:
+                continue
+            self._channels[chan_id] = pubkey
+            alias = _clean_alias(ch.get("peer_alias"))
+            if alias:
+                self._nodes[pubkey] = {"alias": alias, "ts": now}
+
+        for ch in closed_data.get("channels", []) or []:
+            chan_id = str(ch.get("chan_id") or "")
+            pubkey = ch.get("remote_pubkey")
+            if chan_id and chan_id != "0" and pubkey:
+                self._channels[chan_id] = pubkey
+
+        self._channels_ts = now
+        self._dirty = True
+
+    def _lookup_alias(self, lncli_cmd, pubkey):
+        try:
+            data = json.loads(self._run(
+                lncli_cmd + ['getnodeinfo', f'--pub_key={pubkey}'], timeout=5
+            ))
+            alias = _clean_alias((data.get("node") or {}).get("alias"))
+        except Exception:
+            alias = None
+        self._nodes[pubkey] = {"alias": alias, "ts": time.time()}
+        self._dirty = True
+
+    def resolve(self, lncli_cmd, chan_ids, hints=None):
+        """
+        Garante que os chan_ids informados estejam mapeados e com alias.
+
+        `hints` é um dict opcional chan_id -> alias já conhecido (ex.: o
+        peer_alias_out do próprio fwdinghistory), usado só para preencher
+        lacunas e evitar chamadas de getnodeinfo.
+        Retorna dict chan_id -> pubkey (None quando o canal é desconhecido).
+        """
+        with self._lock:
+            now = time.time()
+            chan_ids = {str(c) for c in chan_ids if c}
+            missing = [c for c in chan_ids if c not in self._channels]
+            expired = now - self._channels_ts > self.ttl
+            # Conta desde a última tentativa: se o lncli falhar, não repete a cada requisição
+            may_reload = now - self._channels_attempt_ts > self.channels_min_interval
+            if (expired or missing) and may_reload:
+                self._channels_attempt_ts = now
+                try:
+                    self._refresh_channels(lncli_cmd)
+                except Exception:
+                    pass
+
+            mapping = {c: self._channels.get(c) for c in chan_ids}
+
+            for chan_id, alias in (hints or {}).items():
+                pubkey = mapping.get(str(chan_id))
+                alias = _clean_alias(alias)
+                if pubkey and alias and not (self._nodes.get(pubkey) or {}).get("alias"):
+                    self._nodes[pubkey] = {"alias": alias, "ts": now}
+                    self._dirty = True
+
+            # Busca aliases ausentes primeiro, depois os vencidos
+            pubkeys = {p for p in mapping.values() if p}
+            absent = [p for p in pubkeys if p not in self._nodes]
+            stale = [p for p in pubkeys
+                     if p in self._nodes and now - float(self._nodes[p].get("ts") or 0) > self.ttl]
+            for pubkey in (absent + stale)[: self.max_lookups]:
+                self._lookup_alias(lncli_cmd, pubkey)
+
+            self._save()
+            return mapping
+
+    def alias(self, pubkey):
+        """Alias conhecido do pubkey, ou prefixo do pubkey quando não há."""
+        if not pubkey:
+            return "unknown"
+        entry = self._nodes.get(pubkey) or {}
+        return entry.get("alias") or pubkey[:16]
@@ -0,0 +1,141 @@
+"""
+Assets estáticos com nome versionado por hash e variantes comprimidas.
+
+  - asset_url('vendor/bootstrap.min.css') -> 'vendor/bootstrap.min.1a2b3c4d5e.css'
+    O hash (sha256 do conteúdo) muda quando o arquivo muda, então o browser
+    pode guardar a resposta "para sempre" (Cache-Control immutable).
+  - Variantes gzip e brotli são geradas uma vez por versão do arquivo e
+    ficam em memória; a escolha segue o Accept-Encoding do cliente.
+    brotli é opcional (pip3 install brotli); sem ele, só gzip.
+  - gzip_body() comprime HTML/JSON dinâmicos acima de um tamanho mínimo.
+"""
+import gzip
+import hashlib
+import os
+import re
+import threading
+
+# Tipos que valem a pena comprimir (imagens já vêm comprimidas)
+COMPRESSIBLE_EXT = {".css", ".js", ".svg", ".json", ".webmanifest", ".txt", ".html", ".ico"}
+
+_HASHED_RE = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{10})(?P<ext>\.[^./]+)$")
+
+
+def _brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+def accepted_encodings(accept_encoding):
+    """Conjunto de codificações aceitas (ignora q=0)."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        token, _, params = part.partition(";")
+        token = token.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if token and q > 0:
+            accepted.add(token)
+    return accepted
+
+
+def gzip_body(data, level=6):
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class AssetManifest:
+    """
+    Índice de static/: nome lógico -> hash, com cache das variantes.
+    Entradas são invalidadas pelo (mtime, tamanho) do arquivo.
+    """
+
+    def __init__(self, static_dir):
+        self.static_dir = os.path.abspath(static_dir)
+        self._lock = threading.Lock()
+        self._entries = {}   # filename -> {"stat": (mtime, size), "hash": str, "variants": {enc: bytes}}
+
+    def _path(self, filename):
+        path = os.path.abspath(os.path.join(self.static_dir, filename))
+        if not path.startswith(self.static_dir + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    def _entry(self, filename):
+        path = self._path(filename)
+        if path is None:
+            return None
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is None or entry["stat"] != key:
+                with open(path, "rb") as f:
+                    data = f.read()
+                entry = {
+                    "stat": key,
+                    "hash": hashlib.sha256(data).hexdigest()[:10],
+                    "variants": {"identity": data},
+                }
+                self._entries[filename] = entry
+            return entry
+
+    def url(self, filename):
+        """Nome versionado; se o arquivo não existir, devolve o nome original."""
+        entry = self._entry(filename)
+        if entry is None:
+            return filename
+        stem, ext = os.path.splitext(filename)
+        return f"{stem}.{entry['hash']}{ext}"
+
+    def resolve(self, hashed_name):
+        """
+        'vendor/x.1a2b3c4d5e.css' -> ('vendor/x.css', hash_atual, casou).
+        None se o arquivo não existir.
+        """
+        m = _HASHED_RE.match(hashed_name)
+        filename = f"{m.group('stem')}{m.group('ext')}" if m else hashed_name
+        entry = self._entry(filename)
+        if entry is None:
+            return None
+        return filename, entry["hash"], bool(m) and m.group("hash") == entry["hash"]
+
+    def variant(self, filename, accept_encoding):
+        """
+        Melhor variante para o cliente: (bytes, content_encoding|None).
+        Brotli > gzip > original; só para tipos compressíveis.
+        """
+        entry = self._entry(filename)
+        if entry is None:
+            return None, None
+        variants = entry["variants"]
+        if os.path.splitext(filename)[1].lower() not in COMPRESSIBLE_EXT:
+            return variants["identity"], None
+
+        accepted = accepted_encodings(accept_encoding)
+        brotli = _brotli()
+        candidates = []
+        if brotli is not None and "br" in accepted:
+            candidates.append("br")
+        if "gzip" in accepted:
+            candidates.append("gzip")
+
+        for enc in candidates:
+            with self._lock:
+                body = variants.get(enc)
+                if body is None:
+                    raw = variants["identity"]
+                    body = brotli.compress(raw, quality=11) if enc == "br" else gzip_body(raw, level=9)
+                    variants[enc] = body
+            # Só vale a variante se realmente ficou menor
+            if len(body) < len(variants["identity"]):
+                return body, enc
+        return variants["identity"], None
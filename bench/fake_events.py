@@ -0,0 +1,185 @@
+"""
+Publicador falso de eventos para exercitar o refresh por eventos (refresh.py)
+sem bitcoind/LND de verdade.
+
+  - ZMQ PUB com os tópicos do bitcoind: hashblock e rawtx
+    (multipart [tópico, corpo, seq], como o zmqpub* do bitcoind; pyzmq)
+  - HTTP com os streams REST do LND: uma linha JSON {"result": ...} por evento
+    em /v1/channels/subscribe, /v1/peers/subscribe, /v1/invoices/subscribe
+    e /v2/router/htlcevents
+  - "touch" periódico de arquivos (lnd_fees.sqlite, mensagem)
+
+Uso isolado (Ctrl+C para parar):
+  python3 bench/fake_events.py --zmq-hashblock tcp://127.0.0.1:28334 \\
+      --zmq-rawtx tcp://127.0.0.1:28333 --lnd-rest 127.0.0.1:8089 \\
+      --block-every 5 --rawtx-per-s 20 --channel-every 7 --touch /tmp/message.txt
+"""
+import argparse
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LND_STREAMS = {
+    "/v1/channels/subscribe": "channel",
+    "/v1/peers/subscribe": "peer",
+    "/v1/invoices/subscribe": "invoice",
+    "/v2/router/htlcevents": "htlc",
+}
+
+
+class FakeZmqPublisher:
+    """Socket PUB com a mesma moldura de mensagens do bitcoind."""
+
+    def __init__(self, endpoint, topic):
+        import zmq
+        self.topic = topic.encode()
+        self.seq = 0
+        self.sock = zmq.Context.instance().socket(zmq.PUB)
+        self.sock.bind(endpoint)
+
+    def publish(self, body=None):
+        body = body if body is not None else os.urandom(32)
+        self.sock.send_multipart([self.topic, body, struct.pack("<I", self.seq)])
+        self.seq += 1
+
+    def close(self):
+        self.sock.close(0)
+
+
+class FakeLndRest:
+    """
+    Servidor HTTP com os streams do LND. publish(kind) entrega uma linha a
+    todos os clientes conectados naquele stream.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self._lock = threading.Lock()
+        self._clients = {kind: [] for kind in LND_STREAMS.values()}
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # O grpc-gateway do LND responde em chunked: um chunk por evento
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                kind = LND_STREAMS.get(self.path.split("?")[0])
+                if kind is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                q = queue.Queue()
+                with fake._lock:
+                    fake._clients[kind].append(q)
+                try:
+                    while True:
+                        line = q.get()
+                        if line is None:
+                            self.wfile.write(b"0\r\n\r\n")
+                            return
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                        self.wfile.flush()
+                except OSError:
+                    pass
+                finally:
+                    self.close_connection = True
+                    with fake._lock:
+                        fake._clients[kind].remove(q)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def clients(self, kind):
+        with self._lock:
+            return len(self._clients[kind])
+
+    def publish(self, kind, result=None):
+        line = (json.dumps({"result": result or {"type": f"FAKE_{kind.upper()}_EVENT", "ts": time.time()}}) + "\n").encode()
+        with self._lock:
+            for q in self._clients[kind]:
+                q.put(line)
+
+    def disconnect(self, kind=None):
+        """Encerra os streams abertos (todos, ou só de `kind`), como um LND reiniciando."""
+        with self._lock:
+            for k, clients in self._clients.items():
+                if kind is None or k == kind:
+                    for q in clients:
+                        q.put(None)
+
+    def close(self):
+        self.disconnect()
+        self.server.shutdown()
+
+
+def touch(path):
+    with open(path, "a"):
+        os.utime(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publicador falso de eventos bitcoind/LND")
+    parser.add_argument("--zmq-hashblock", help="endpoint PUB, ex.: tcp://127.0.0.1:28334")
+    parser.add_argument("--zmq-rawtx", help="endpoint PUB, ex.: tcp://127.0.0.1:28333")
+    parser.add_argument("--lnd-rest", help="host:porta do REST falso, ex.: 127.0.0.1:8089")
+    parser.add_argument("--block-every", type=float, default=10.0, help="segundos entre blocos")
+    parser.add_argument("--rawtx-per-s", type=float, default=0.0)
+    parser.add_argument("--channel-every", type=float, default=0.0, help="segundos entre eventos de canal")
+    parser.add_argument("--htlc-per-s", type=float, default=0.0)
+    parser.add_argument("--touch", action="append", default=[], help="arquivo para tocar a cada --touch-every s")
+    parser.add_argument("--touch-every", type=float, default=30.0)
+    args = parser.parse_args()
+
+    hashblock = FakeZmqPublisher(args.zmq_hashblock, "hashblock") if args.zmq_hashblock else None
+    rawtx = FakeZmqPublisher(args.zmq_rawtx, "rawtx") if args.zmq_rawtx else None
+    rest = None
+    if args.lnd_rest:
+        host, _, port = args.lnd_rest.rpartition(":")
+        rest = FakeLndRest(host or "127.0.0.1", int(port))
+        print(f"LND REST falso em {rest.url}")
+
+    schedule = []   # [próximo, intervalo, ação]
+    if hashblock:
+        schedule.append([0.0, args.block_every, hashblock.publish])
+    if rawtx and args.rawtx_per_s > 0:
+        schedule.append([0.0, 1.0 / args.rawtx_per_s, rawtx.publish])
+    if rest and args.channel_every > 0:
+        schedule.append([0.0, args.channel_every, lambda: rest.publish("channel")])
+    if rest and args.htlc_per_s > 0:
+        schedule.append([0.0, 1.0 / args.htlc_per_s, lambda: rest.publish("htlc")])
+    for path in args.touch:
+        schedule.append([0.0, args.touch_every, lambda p=path: touch(p)])
+
+    t0 = time.monotonic()
+    for item in schedule:
+        item[0] = t0 + item[1]
+    try:
+        while True:
+            if not schedule:
+                time.sleep(3600)
+                continue
+            item = min(schedule, key=lambda i: i[0])
+            time.sleep(max(0.0, item[0] - time.monotonic()))
+            item[2]()
+            item[0] += item[1]
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pub in (hashblock, rawtx, rest):
+            if pub is not None:
+                pub.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Nó sintético para benchmark: imita a saída JSON de lncli, bitcoin-cli e do
+`app` do Umbrel, com tamanho e latência configuráveis por variáveis de ambiente.
+
+  BENCH_CHANNELS     canais abertos (default 2000)
+  BENCH_CLOSED       canais fechados (default BENCH_CHANNELS // 4)
+  BENCH_FWD_EVENTS   eventos de fwdinghistory na janela (default 1000000)
+  BENCH_BTC_PEERS    peers do bitcoind (default 500)
+  BENCH_LATENCY_MS   atraso artificial por chamada (default 0)
+  BENCH_CALL_LOG     se definido, cada chamada acrescenta uma linha nesse arquivo
+
+A saída é determinística: o mesmo cenário gera sempre os mesmos dados.
+"""
+import json
+import os
+import sys
+import time
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+CHANNELS   = _env_int("BENCH_CHANNELS", 2000)
+CLOSED     = _env_int("BENCH_CLOSED", CHANNELS // 4)
+FWD_EVENTS = _env_int("BENCH_FWD_EVENTS", 1000000)
+BTC_PEERS  = _env_int("BENCH_BTC_PEERS", 500)
+LATENCY_MS = _env_int("BENCH_LATENCY_MS", 0)
+
+
+def _pubkey(i):
+    return "02" + f"{i:064x}"
+
+
+def _chan_id(i):
+    # scid "realista": bloco << 40 | tx << 16 | output
+    return str(((700000 + i) << 40) | ((i % 3000) << 16) | (i % 2))
+
+
+def _chan_index(i):
+    """Distribuição enviesada: poucos canais concentram a maior parte do tráfego."""
+    total = CHANNELS + CLOSED
+    return (i * i + 7 * i) % total if i % 4 else (i % 50) % total
+
+
+# -----------------------------
+# lncli
+# -----------------------------
+def _listchannels():
+    channels = []
+    for i in range(CHANNELS):
+        capacity = 1000000 + (i % 20) * 500000
+        local = (i * 7919) % capacity
+        channels.append({
+            "active": i % 17 != 0,
+            "remote_pubkey": _pubkey(i),
+            "chan_id": _chan_id(i),
+            "capacity": str(capacity),
+            "local_balance": str(local),
+            "remote_balance": str(capacity - local),
+            "peer_alias": f"peer-{i}" if i % 5 else "",
+        })
+    return {"channels": channels}
+
+
+def _closedchannels():
+    return {"channels": [
+        {"chan_id": _chan_id(CHANNELS + i), "remote_pubkey": _pubkey(CHANNELS + i)}
+        for i in range(CLOSED)
+    ]}
+
+
+def _fwdinghistory(args):
+    opts = dict(a.lstrip("-").split("=", 1) for a in args if a.startswith("--") and "=" in a)
+    start = int(opts.get("start_time", 0))
+    end = int(opts.get("end_time", int(time.time())))
+    offset = int(opts.get("index_offset", 0))
+    max_events = int(opts.get("max_events", 100))
+    skip_alias = "--skip_peer_alias_lookup" in args
+
+    span = max(end - start, 1)
+    chan_ids = [_chan_id(i) for i in range(CHANNELS + CLOSED)]
+    stop = min(offset + max_events, FWD_EVENTS)
+    events = []
+    for i in range(offset, stop):
+        c_in = _chan_index(i)
+        c_out = _chan_index(i + 1)
+        amt_out = 10000000 + (i % 997) * 100000
+        fee = 1000 + (amt_out // 1000000) * ((i % 13) * 100)
+        ev = {
+            "timestamp": str(start + (i * span) // max(FWD_EVENTS, 1)),
+            "chan_id_in": chan_ids[c_in],
+            "chan_id_out": chan_ids[c_out],
+            "amt_in_msat": str(amt_out + fee),
+            "amt_out_msat": str(amt_out),
+            "fee_msat": str(fee),
+        }
+        if not skip_alias:
+            ev["peer_alias_in"] = f"peer-{c_in}"
+            ev["peer_alias_out"] = f"peer-{c_out}"
+        events.append(ev)
+    return {"forwarding_events": events, "last_offset_index": stop}
+
+
+def _getnodeinfo(args):
+    pubkey = next((a.split("=", 1)[1] for a in args if a.startswith("--pub_key=")), "")
+    return {"node": {"pub_key": pubkey, "alias": f"node-{pubkey[-6:]}"}}
+
+
+def lncli(args):
+    # Flags globais (--rpcserver, --macaroonpath, ...) vêm antes do subcomando.
+    # --bench_latency_ms=N é só do stub: simula um nó remoto lento.
+    while args and args[0].startswith("-"):
+        if args[0].startswith("--bench_latency_ms="):
+            time.sleep(int(args[0].split("=", 1)[1]) / 1000.0)
+        args = args[1:]
+    cmd, rest = args[0], args[1:]
+    if cmd == "walletbalance":
+        return {"total_balance": "123456789"}
+    if cmd == "channelbalance":
+        return {"balance": str(CHANNELS * 2500000)}
+    if cmd == "listchannels":
+        return _listchannels()
+    if cmd == "closedchannels":
+        return _closedchannels()
+    if cmd == "listpeers":
+        return {"peers": [{"pub_key": _pubkey(i)} for i in range(CHANNELS)]}
+    if cmd == "getinfo":
+        return {
+            "alias": "bench-node",
+            "version": "0.18.0-beta",
+            "identity_pubkey": _pubkey(10 ** 9),
+            "num_pending_channels": 0,
+            "num_active_channels": CHANNELS - CHANNELS // 17,
+            "num_inactive_channels": CHANNELS // 17,
+            "synced_to_chain": True,
+            "synced_to_graph": True,
+        }
+    if cmd == "fwdinghistory":
+        return _fwdinghistory(rest)
+    if cmd == "getnodeinfo":
+        return _getnodeinfo(rest)
+    if cmd == "feereport":
+        return {"day_fee_sum": "1234", "week_fee_sum": "8642", "month_fee_sum": "37037"}
+    raise SystemExit(f"fake lncli: unsupported command {cmd}")
+
+
+# -----------------------------
+# bitcoin-cli
+# -----------------------------
+def bitcoin_cli(args):
+    args = [a for a in args if not a.startswith("-")]
+    cmd = args[0]
+    if cmd == "getblockchaininfo":
+        return {"chain": "main", "blocks": 870000, "verificationprogress": 0.99999, "pruned": False}
+    if cmd == "getpeerinfo":
+        return [
+            {"id": i, "addr": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}:8333",
+             "subver": "/Satoshi:27.0.0/", "inbound": bool(i % 2)}
+            for i in range(BTC_PEERS)
+        ]
+    if cmd == "getnetworkinfo":
+        return {"version": 270000, "subversion": "/Satoshi:27.0.0/"}
+    raise SystemExit(f"fake bitcoin-cli: unsupported command {cmd}")
+
+
+# -----------------------------
+# app (Umbrel): app compose <app> exec <container> <bin> <args...>
+# -----------------------------
+def umbrel_app(args):
+    binary, rest = args[4], args[5:]
+    if binary == "lncli":
+        return lncli(rest)
+    if binary == "bitcoin-cli":
+        return bitcoin_cli(rest)
+    raise SystemExit(f"fake app: unsupported binary {binary}")
+
+
+HANDLERS = {
+    "lncli": lncli,
+    "bitcoin-cli": bitcoin_cli,
+    "app": umbrel_app,
+}
+
+
+def main(name, args):
+    log = os.environ.get("BENCH_CALL_LOG")
+    if log:
+        with open(log, "a") as f:
+            f.write(" ".join([name] + args[:6]) + "\n")
+    if LATENCY_MS:
+        time.sleep(LATENCY_MS / 1000.0)
+    json.dump(HANDLERS[name](args), sys.stdout)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], sys.argv[2:])
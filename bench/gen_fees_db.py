@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gera um lnd_fees.sqlite sintético (tabela daily_fees) para benchmark.
+
+Uso:
+  python3 bench/gen_fees_db.py /tmp/lnd_fees.sqlite --days 3650 --rows-per-day 24
+"""
+import argparse
+import datetime
+import sqlite3
+
+
+def generate(path, days=3650, rows_per_day=1, end=None):
+    """Cria/recria daily_fees com `days` dias e `rows_per_day` linhas por dia."""
+    end = end or datetime.date.today()
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("DROP TABLE IF EXISTS daily_fees")
+        conn.execute(
+            """
+            CREATE TABLE daily_fees (
+                date               TEXT,
+                forward_fees_sat   INTEGER,
+                rebalance_fees_sat INTEGER,
+                net_profit_sat     INTEGER
+            )
+            """
+        )
+
+        def rows():
+            for d in range(days):
+                day = (end - datetime.timedelta(days=d)).isoformat()
+                for r in range(rows_per_day):
+                    fwd = 1000 + (d * 37 + r * 11) % 9000
+                    reb = (d * 53 + r * 7) % 4000
+                    yield (day, fwd, reb, fwd - reb)
+
+        conn.executemany("INSERT INTO daily_fees VALUES (?, ?, ?, ?)", rows())
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--days", type=int, default=3650)
+    parser.add_argument("--rows-per-day", type=int, default=1)
+    args = parser.parse_args()
+    generate(args.path, days=args.days, rows_per_day=args.rows_per_day)
+    print(f"{args.path}: {args.days * args.rows_per_day} linhas")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark do refresh por eventos: node-status.py + nó sintético + publicador
+falso (fake_events.py) por alguns segundos.
+
+Mede:
+  - latência evento -> seção recalculada (hashblock -> bitcoin,
+    evento de canal -> lnd, arquivo de mensagem alterado -> message)
+  - quantas execuções de coletor (chamadas lncli/bitcoin-cli) o tráfego de
+    eventos custou, e quantas notificações o debounce absorveu
+
+Uso:
+  python3 bench/refresh_bench.py --duration 30
+  python3 bench/refresh_bench.py --duration 30 --rawtx-per-s 200 --htlc-per-s 50
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from fake_events import FakeLndRest, FakeZmqPublisher, touch
+from run_bench import PROFILES, RESULTS_DIR, bench_env, load_node_status, prepare_workdir, wait_ready
+
+
+def _free_tcp_endpoint():
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"tcp://127.0.0.1:{s.getsockname()[1]}"
+
+
+def _wait_refresh(ns, section, before, timeout=10.0):
+    """Espera a seção ser recalculada; retorna a latência em ms (None se estourar)."""
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        if ns.refresher.state()["sections"][section]["refreshes"] > before:
+            return (time.perf_counter() - t0) * 1000
+        time.sleep(0.005)
+    return None
+
+
+def _background(stop, every, action):
+    while not stop.wait(every):
+        action()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do refresh por eventos")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--debounce", type=float, default=0.5)
+    parser.add_argument("--rawtx-per-s", type=float, default=50.0)
+    parser.add_argument("--htlc-per-s", type=float, default=10.0)
+    parser.add_argument("--block-every", type=float, default=5.0)
+    args = parser.parse_args()
+
+    scenario = dict(PROFILES[args.profile], latency_ms=0)
+    with tempfile.TemporaryDirectory(prefix="node-status-refresh-") as tmp:
+        workdir = Path(tmp)
+        db_path = prepare_workdir(workdir, scenario, "minibolt")
+        call_log = workdir / "calls.log"
+        os.environ.update(bench_env(scenario, db_path, call_log))
+
+        hashblock_endpoint, rawtx_endpoint = _free_tcp_endpoint(), _free_tcp_endpoint()
+        hashblock = FakeZmqPublisher(hashblock_endpoint, "hashblock")
+        rawtx = FakeZmqPublisher(rawtx_endpoint, "rawtx")
+        rest = FakeLndRest()
+        with open(workdir / "node-status.config", "a") as f:
+            f.write(
+                "\n[refresh]\n"
+                f"DEBOUNCE_S = {args.debounce}\n"
+                f"RAWTX_DEBOUNCE_S = {args.debounce * 4}\n"
+                "FILE_POLL_S = 0.2\n"
+                f"ZMQ_HASHBLOCK = {hashblock_endpoint}\n"
+                f"ZMQ_RAWTX = {rawtx_endpoint}\n"
+                f"LND_REST_URL = {rest.url}\n"
+            )
+
+        ns = load_node_status(workdir)
+        client = ns.app.test_client()
+        wait_ready(client)
+        # Espera as fontes conectarem (streams HTTP e SUB do zmq)
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and not (rest.clients("channel") and rest.clients("htlc")):
+            time.sleep(0.05)
+        time.sleep(0.5)
+        call_log.unlink(missing_ok=True)
+        ns.refresher.stats.update({k: 0 for k in ns.refresher.stats})
+
+        stop = threading.Event()
+        noise = [
+            threading.Thread(target=_background, args=(stop, 1.0 / args.rawtx_per_s, rawtx.publish), daemon=True),
+            threading.Thread(target=_background, args=(stop, 1.0 / args.htlc_per_s, lambda: rest.publish("htlc")), daemon=True),
+        ]
+        for t in noise:
+            t.start()
+
+        latencies = {"bitcoin": [], "lnd": [], "message": []}
+        events = Counter()
+        t_end = time.monotonic() + args.duration
+        message_path = workdir / "message.txt"
+        while time.monotonic() < t_end:
+            for section, fire in (
+                ("bitcoin", hashblock.publish),
+                ("lnd", lambda: rest.publish("channel")),
+                ("message", lambda: (message_path.write_text(f"**bench** {time.time()}\n"), touch(message_path))),
+            ):
+                before = ns.refresher.state()["sections"][section]["refreshes"]
+                fire()
+                events[section] += 1
+                latency = _wait_refresh(ns, section, before)
+                if latency is not None:
+                    latencies[section].append(latency)
+            time.sleep(args.block_every)
+        stop.set()
+
+        state = ns.refresher.state()
+        calls = Counter()
+        if call_log.exists():
+            for line in call_log.read_text().splitlines():
+                calls[" ".join(line.split()[:2])] += 1
+
+        summary = {
+            section: {
+                "events": events[section],
+                "refreshed": len(values),
+                "p50_ms": round(statistics.median(values), 1) if values else None,
+                "max_ms": round(max(values), 1) if values else None,
+            }
+            for section, values in latencies.items()
+        }
+        print(f"{'seção':10s} {'eventos':>8s} {'ok':>4s} {'p50':>9s} {'max':>9s}")
+        for section, s in summary.items():
+            print(f"{section:10s} {s['events']:>8d} {s['refreshed']:>4d} "
+                  f"{s['p50_ms'] or 0:>7.1f}ms {s['max_ms'] or 0:>7.1f}ms")
+        print(f"notificações={state['stats']['notifications']} agrupadas={state['stats']['coalesced']} "
+              f"recálculos={state['stats']['recomputes']}")
+        print("chamadas de coletor:", dict(calls.most_common()))
+
+        report = {
+            "generated_at": datetime.utcnow().isoformat() + "Z",
+            "args": vars(args),
+            "summary": summary,
+            "scheduler": state,
+            "collector_calls": dict(calls),
+        }
+        RESULTS_DIR.mkdir(exist_ok=True)
+        out = RESULTS_DIR / f"refresh-{args.profile}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json"
+        out.write_text(json.dumps(report, indent=2))
+        print(f"resultado: {out}")
+
+        ns.refresher.stop()
+        for pub in (hashblock, rawtx, rest):
+            pub.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de /status, /top-peers, /lnd-fees e /fwd-analytics contra um nó sintético.
+
+Cada endpoint roda num processo separado (para o pico de RSS ser dele),
+com lncli/bitcoin-cli/app trocados pelos stubs de bench/bin e um
+lnd_fees.sqlite gerado por bench/gen_fees_db.py. Mede latência (p50/p90/p99),
+pico de RSS e número de subprocessos por requisição via Flask test client.
+
+Uso:
+  python3 bench/run_bench.py --profile large
+  python3 bench/run_bench.py --profile large --save-baseline
+  python3 bench/run_bench.py --profile small --env umbrel --latency-ms 50
+
+Com baseline salvo (bench/baseline-<profile>.json), o resultado é comparado
+e o script sai com código 1 se alguma métrica piorar além da tolerância.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+BIN_DIR = BENCH_DIR / "bin"
+RESULTS_DIR = BENCH_DIR / "results"
+
+sys.path.insert(0, str(BENCH_DIR))
+from gen_fees_db import generate as generate_fees_db  # noqa: E402
+
+PROFILES = {
+    "small": {"channels": 50, "events": 5000, "btc_peers": 20, "db_days": 365, "db_rows_per_day": 1},
+    "large": {"channels": 2000, "events": 1000000, "btc_peers": 500, "db_days": 3650, "db_rows_per_day": 24},
+}
+
+ENDPOINTS = ["/status", "/top-peers?days=30", "/lnd-fees", "/fwd-analytics?days=30"]
+
+# Métricas comparadas com o baseline (maior = pior). p50/p90 e subprocessos
+# são medidos com o cache de resultados (flights) limpo a cada requisição,
+# para o gate pegar regressão nos coletores; cached_* mede o caminho com cache
+# (a latência com cache fica em poucos ms, ruidosa demais para o gate).
+TRACKED = ("p50_ms", "p90_ms", "peak_rss_kb", "subprocesses_per_request",
+           "cached_subprocesses_per_request")
+# Latências abaixo disso variam mais que a tolerância só por ruído do
+# agendador; a diferença em ms precisa passar desse piso para contar.
+LATENCY_SLACK_MS = 10.0
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _count_lines(path):
+    try:
+        with open(path) as f:
+            return sum(1 for _ in f)
+    except FileNotFoundError:
+        return 0
+
+
+# -----------------------------
+# Worker (um processo por endpoint)
+# -----------------------------
+def load_node_status(workdir):
+    """Importa node-status.py com o config do diretório de benchmark."""
+    os.chdir(workdir)
+    sys.path.insert(0, str(REPO_DIR))
+    spec = importlib.util.spec_from_file_location("node_status", REPO_DIR / "node-status.py")
+    ns = importlib.util.module_from_spec(spec)
+    # Flask acha templates/ e static/ pelo módulo em sys.modules
+    sys.modules["node_status"] = ns
+    spec.loader.exec_module(ns)
+
+    # Taxas vêm da internet (mempool.space); fora do escopo do custo do nó.
+    # O stub passa pelo mesmo flight (cache, .warm/.refresh) que a função real.
+    ns.get_fee_info = ns.flights["fees"].wrap(lambda: {
+        "fastestFee": 30, "halfHourFee": 20, "hourFee": 10,
+        "economyFee": 5, "minimumFee": 1, "_source": "bench",
+    })
+    return ns
+
+
+def wait_ready(client, timeout=300):
+    """Espera o /readyz responder 200; retorna o tempo em ms."""
+    t0 = time.perf_counter()
+    while client.get("/readyz").status_code != 200:
+        if time.perf_counter() - t0 > timeout:
+            raise SystemExit("timeout esperando /readyz")
+        time.sleep(0.02)
+    return (time.perf_counter() - t0) * 1000
+
+
+def run_worker(endpoint, workdir, iterations):
+    ns = load_node_status(workdir)
+    call_log = os.environ["BENCH_CALL_LOG"]
+    client = ns.app.test_client()
+    ready_ms = wait_ready(client)
+
+    t0 = time.perf_counter()
+    first = client.get(endpoint)
+    cold_ms = (time.perf_counter() - t0) * 1000
+    calls_before = _count_lines(call_log)
+    statuses = {str(first.status_code): 1}
+
+    def timed(uncached):
+        samples = []
+        before = _count_lines(call_log)
+        for _ in range(iterations):
+            if uncached:
+                # Sem isso só se mede acerto de cache (TTL/stale dos flights)
+                for flight in ns.flights.values():
+                    flight.forget(keep_stale=False)
+            t0 = time.perf_counter()
+            resp = client.get(endpoint)
+            samples.append((time.perf_counter() - t0) * 1000)
+            statuses[str(resp.status_code)] = statuses.get(str(resp.status_code), 0) + 1
+        samples.sort()
+        return samples, _count_lines(call_log) - before
+
+    samples, calls = timed(uncached=True)
+    cached_samples, cached_calls = timed(uncached=False)
+    return {
+        "endpoint": endpoint,
+        "iterations": iterations,
+        "status_codes": statuses,
+        "ready_ms": round(ready_ms, 2),
+        "cold_ms": round(cold_ms, 2),
+        "p50_ms": round(_percentile(samples, 50), 2),
+        "p90_ms": round(_percentile(samples, 90), 2),
+        "p99_ms": round(_percentile(samples, 99), 2),
+        "max_ms": round(samples[-1], 2),
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "children_peak_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        "subprocesses_cold": calls_before,
+        "subprocesses_per_request": round(calls / iterations, 2) if iterations else 0,
+        "cached_p50_ms": round(_percentile(cached_samples, 50), 2),
+        "cached_p90_ms": round(_percentile(cached_samples, 90), 2),
+        "cached_subprocesses_per_request": round(cached_calls / iterations, 2) if iterations else 0,
+    }
+
+
+# -----------------------------
+# Orquestração
+# -----------------------------
+def _write_config(workdir, env_name):
+    message = workdir / "message.txt"
+    message.write_text("**bench**\n")
+    (workdir / "node-status.config").write_text(
+        "[settings]\n"
+        f"RUNNING_ENVIRONMENT = {env_name}\n"
+        "RUNNING_BITCOIN = local\n"
+        f"MESSAGE_FILE_PATH = {message}\n"
+        f"ALIAS_CACHE_PATH = {workdir / 'alias_cache.json'}\n"
+        f"LIQUIDITY_HISTORY_PATH = {workdir / 'liquidity_history.bin'}\n"
+        "\n[umbrel]\n"
+        f"UMBREL_PATH = {BIN_DIR}/\n"
+    )
+
+
+def prepare_workdir(workdir, scenario, env_name):
+    """Config, mensagem e lnd_fees.sqlite sintéticos; retorna o caminho do DB."""
+    _write_config(workdir, env_name)
+    db_path = workdir / "lnd_fees.sqlite"
+    generate_fees_db(str(db_path), days=scenario["db_days"], rows_per_day=scenario["db_rows_per_day"])
+    return db_path
+
+
+def bench_env(scenario, db_path, call_log):
+    """Ambiente do worker: stubs no PATH e tamanho do nó sintético."""
+    env = dict(os.environ)
+    env.update({
+        "PATH": f"{BIN_DIR}{os.pathsep}{env.get('PATH', '')}",
+        "LND_FEES_DB": str(db_path),
+        "BENCH_CALL_LOG": str(call_log),
+        "BENCH_CHANNELS": str(scenario["channels"]),
+        "BENCH_FWD_EVENTS": str(scenario["events"]),
+        "BENCH_BTC_PEERS": str(scenario["btc_peers"]),
+        "BENCH_LATENCY_MS": str(scenario["latency_ms"]),
+    })
+    return env
+
+
+def run_profile(scenario, env_name, iterations, endpoints):
+    results = []
+    with tempfile.TemporaryDirectory(prefix="node-status-bench-") as tmp:
+        workdir = Path(tmp)
+        db_path = prepare_workdir(workdir, scenario, env_name)
+
+        for endpoint in endpoints:
+            env = bench_env(scenario, db_path, workdir / f"calls-{len(results)}.log")
+            # Cada endpoint começa com cache de alias frio
+            (workdir / "alias_cache.json").unlink(missing_ok=True)
+            proc = subprocess.run(
+                [sys.executable, __file__, "--worker", endpoint,
+                 "--workdir", str(workdir), "--iterations", str(iterations)],
+                capture_output=True, text=True, env=env,
+            )
+            if proc.returncode != 0:
+                raise SystemExit(f"worker {endpoint} falhou:\n{proc.stderr}")
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            results.append(result)
+            print(f"{endpoint:24s} p50={result['p50_ms']:>9.1f}ms p90={result['p90_ms']:>9.1f}ms "
+                  f"cold={result['cold_ms']:>9.1f}ms rss={result['peak_rss_kb'] / 1024:>7.1f}MB "
+                  f"subproc/req={result['subprocesses_per_request']} http={result['status_codes']}")
+            print(f"{'  (cache)':24s} p50={result['cached_p50_ms']:>9.1f}ms p90={result['cached_p90_ms']:>9.1f}ms "
+                  f"subproc/req={result['cached_subprocesses_per_request']}")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Lista de regressões (endpoint, métrica, baseline, atual)."""
+    base = {r["endpoint"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        b = base.get(r["endpoint"])
+        if not b:
+            continue
+        for metric in TRACKED:
+            old, new = b.get(metric), r.get(metric)
+            if old is None or new is None:
+                continue
+            # Contagem de subprocessos é determinística: qualquer aumento conta
+            if metric in ("subprocesses_per_request", "cached_subprocesses_per_request"):
+                limit = old
+            elif metric.endswith("_ms"):
+                limit = max(old * (1 + tolerance), old + LATENCY_SLACK_MS)
+            else:
+                limit = old * (1 + tolerance)
+            if new > limit:
+                regressions.append((r["endpoint"], metric, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do node-status com nó sintético")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small")
+    parser.add_argument("--env", choices=["minibolt", "umbrel"], default="minibolt")
+    parser.add_argument("--channels", type=int)
+    parser.add_argument("--events", type=int)
+    parser.add_argument("--btc-peers", type=int)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--endpoint", action="append", help="repetível; default: todos")
+    parser.add_argument("--baseline", help="default: bench/baseline-<profile>.json")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    # modo interno
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.workdir, args.iterations)))
+        return 0
+
+    scenario = dict(PROFILES[args.profile])
+    for key in ("channels", "events", "btc_peers"):
+        if getattr(args, key) is not None:
+            scenario[key] = getattr(args, key)
+    scenario["latency_ms"] = args.latency_ms
+
+    results = run_profile(scenario, args.env, args.iterations, args.endpoint or ENDPOINTS)
+    report = {
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "profile": args.profile,
+        "env": args.env,
+        "scenario": scenario,
+        "iterations": args.iterations,
+        "results": results,
+    }
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    out = RESULTS_DIR / f"{args.profile}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json"
+    out.write_text(json.dumps(report, indent=2))
+    print(f"resultado: {out}")
+
+    baseline_path = Path(args.baseline or BENCH_DIR / f"baseline-{args.profile}.json")
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2))
+        print(f"baseline salvo: {baseline_path}")
+        return 0
+
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text())
+        if baseline.get("scenario") != scenario:
+            print("aviso: cenário diferente do baseline; comparação pode não ser válida")
+        regressions = compare(results, baseline, args.tolerance)
+        for endpoint, metric, old, new in regressions:
+            print(f"REGRESSÃO {endpoint} {metric}: {old} -> {new}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de cold start: tempo de import do node-status.py, tempo até o
+/readyz responder 200 (warm-up completo) e latência do primeiro /status.
+
+Cada amostra é um processo novo. Também lista quais módulos pesados já
+estão carregados logo após o import (devem ser nenhum).
+
+Uso:
+  python3 bench/startup_bench.py --runs 5
+  python3 bench/startup_bench.py --runs 5 --save-baseline
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from run_bench import (BENCH_DIR, PROFILES, RESULTS_DIR, bench_env, load_node_status,
+                       prepare_workdir, wait_ready)
+
+HEAVY_MODULES = ("requests", "psutil", "cpuinfo", "sensors", "markdown")
+TRACKED = ("import_ms", "ready_ms", "first_status_ms")
+
+
+def run_sample(workdir):
+    t0 = time.perf_counter()
+    ns = load_node_status(workdir)
+    import_ms = (time.perf_counter() - t0) * 1000
+    eager = [m for m in HEAVY_MODULES if m in sys.modules]
+
+    client = ns.app.test_client()
+    client.get("/healthz")
+    wait_ready(client)
+    ready_ms = (time.perf_counter() - t0) * 1000
+
+    t1 = time.perf_counter()
+    client.get("/status")
+    first_status_ms = (time.perf_counter() - t1) * 1000
+    return {
+        "import_ms": round(import_ms, 2),
+        "ready_ms": round(ready_ms, 2),
+        "first_status_ms": round(first_status_ms, 2),
+        "eager_heavy_modules": eager,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de cold start do node-status")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small")
+    parser.add_argument("--env", choices=["minibolt", "umbrel"], default="minibolt")
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--sample", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.sample:
+        print(json.dumps(run_sample(args.sample)))
+        return 0
+
+    scenario = dict(PROFILES[args.profile], latency_ms=args.latency_ms)
+    samples = []
+    with tempfile.TemporaryDirectory(prefix="node-status-startup-") as tmp:
+        workdir = Path(tmp)
+        db_path = prepare_workdir(workdir, scenario, args.env)
+        for i in range(args.runs):
+            proc = subprocess.run(
+                [sys.executable, __file__, "--sample", str(workdir)],
+                capture_output=True, text=True,
+                env=bench_env(scenario, db_path, workdir / f"calls-{i}.log"),
+            )
+            if proc.returncode != 0:
+                raise SystemExit(f"amostra falhou:\n{proc.stderr}")
+            samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    summary = {m: round(statistics.median(s[m] for s in samples), 2) for m in TRACKED}
+    summary["eager_heavy_modules"] = sorted({m for s in samples for m in s["eager_heavy_modules"]})
+    for m in TRACKED:
+        print(f"{m:16s} mediana={summary[m]:>9.1f}ms")
+    print(f"módulos pesados no import: {summary['eager_heavy_modules'] or 'nenhum'}")
+
+    report = {
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+        "profile": args.profile,
+        "env": args.env,
+        "scenario": scenario,
+        "runs": args.runs,
+        "summary": summary,
+        "samples": samples,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    out = RESULTS_DIR / f"startup-{args.profile}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json"
+    out.write_text(json.dumps(report, indent=2))
+    print(f"resultado: {out}")
+
+    baseline_path = BENCH_DIR / f"baseline-startup-{args.profile}.json"
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2))
+        print(f"baseline salvo: {baseline_path}")
+        return 0
+    if baseline_path.exists():
+        base = json.loads(baseline_path.read_text())["summary"]
+        regressions = [(m, base[m], summary[m]) for m in TRACKED
+                       if m in base and summary[m] > base[m] * (1 + args.tolerance)]
+        for metric, old, new in regressions:
+            print(f"REGRESSÃO {metric}: {old} -> {new}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
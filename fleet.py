@@ -0,0 +1,167 @@
+"""
+Modo frota: vários nós descritos no node-status.config, coletados em paralelo.
+
+Cada nó é uma seção [node:<nome>] com as mesmas chaves de [settings],
+[bitcoin] e [umbrel], mais:
+
+  LNCLI_ARGS = --rpcserver=10.0.0.2:10009 --tlscertpath=... --macaroonpath=...
+  TIMEOUT    = 8      (segundos; limite por nó)
+  LABEL      = Nome exibido (default: o <nome> da seção)
+
+A coleta usa asyncio com subprocessos assíncronos: todos os comandos de todos
+os nós rodam ao mesmo tempo, cada nó com seu próprio timeout. Um nó lento ou
+fora do ar só atrasa (e marca como erro) a própria linha; o tempo total segue
+o nó mais lento, não a soma.
+"""
+import asyncio
+import json
+import shlex
+import time
+
+import node_info
+
+DEFAULT_TIMEOUT = 8.0
+
+
+def load_nodes(config):
+    """Lê as seções [node:*] do config; lista vazia quando não há frota."""
+    nodes = []
+    for section in config.sections():
+        if not section.startswith('node:'):
+            continue
+        name = section.split(':', 1)[1].strip()
+        get = lambda key, fallback=None: config.get(section, key, fallback=fallback)  # noqa: E731
+        nodes.append({
+            "name": name,
+            "label": get('LABEL', name),
+            "environment": get('RUNNING_ENVIRONMENT', 'minibolt'),
+            "running_bitcoin": get('RUNNING_BITCOIN', 'local'),
+            "umbrel_path": get('UMBREL_PATH', '/path/to/umbrel/scripts/'),
+            "lncli_args": shlex.split(get('LNCLI_ARGS', '')),
+            "bitcoin_rpc_user": get('BITCOIN_RPC_USER'),
+            "bitcoin_rpc_pass": get('BITCOIN_RPC_PASSWORD'),
+            "bitcoin_rpc_host": get('BITCOIN_RPC_HOST'),
+            "bitcoin_rpc_port": get('BITCOIN_RPC_PORT', '8332'),
+            "timeout": config.getfloat(section, 'TIMEOUT', fallback=DEFAULT_TIMEOUT),
+        })
+    return nodes
+
+
+async def _run_json(cmd):
+    """Executa o comando sem bloquear o loop; mata o processo se for cancelado."""
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await proc.communicate()
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} -> exit {proc.returncode}: {stderr.decode().strip()}")
+    return json.loads(stdout)
+
+
+async def _gather_section(base_cmd, commands, timeout):
+    """Roda os subcomandos em paralelo com um timeout para o conjunto."""
+    try:
+        return await asyncio.wait_for(
+            asyncio.gather(*(_run_json(base_cmd + [c]) for c in commands)), timeout
+        )
+    except asyncio.TimeoutError:
+        raise RuntimeError(f"timeout após {timeout:g}s")
+
+
+async def _collect_bitcoin(node):
+    try:
+        base_cmd, label = node_info.bitcoin_cli_base_cmd(
+            node["environment"], node["running_bitcoin"], node["umbrel_path"],
+            node["bitcoin_rpc_user"], node["bitcoin_rpc_pass"],
+            node["bitcoin_rpc_host"], node["bitcoin_rpc_port"],
+        )
+        results = await _gather_section(base_cmd, node_info.BITCOIN_COMMANDS, node["timeout"])
+        return node_info.build_bitcoin_info(*results, label)
+    except Exception as e:
+        return node_info.bitcoin_info_error(e)
+
+
+async def _collect_lnd(node):
+    lncli_cmd = node_info.lncli_base_cmd(node["environment"], node["umbrel_path"], node["lncli_args"])
+    try:
+        results = await _gather_section(lncli_cmd, node_info.LND_COMMANDS + ['feereport'], node["timeout"])
+        lnd = node_info.build_lnd_info(*results[:-1])
+        fees = results[-1]
+        lnd["fees"] = {
+            "day_sat": int(fees.get("day_fee_sum", 0) or 0),
+            "week_sat": int(fees.get("week_fee_sum", 0) or 0),
+            "month_sat": int(fees.get("month_fee_sum", 0) or 0),
+        }
+        return lnd
+    except Exception as e:
+        lnd = node_info.lnd_info_error(e)
+        lnd["fees"] = None
+        return lnd
+
+
+async def collect_node(node):
+    t0 = time.monotonic()
+    bitcoin, lnd = await asyncio.gather(_collect_bitcoin(node), _collect_lnd(node))
+    return {
+        "name": node["name"],
+        "label": node["label"],
+        "bitcoin": bitcoin,
+        "lnd": lnd,
+        "ok": not bitcoin.get("error") and not lnd.get("error"),
+        "elapsed_s": round(time.monotonic() - t0, 3),
+    }
+
+
+async def _collect_all(nodes):
+    return await asyncio.gather(*(collect_node(n) for n in nodes))
+
+
+def collect_fleet(nodes):
+    """
+    Coleta todos os nós em paralelo (chamável de uma rota Flask síncrona).
+    Retorna {"nodes": [...], "totals": {...}, "elapsed_s": ..., "generated_at": ...}.
+    """
+    t0 = time.monotonic()
+    results = asyncio.run(_collect_all(nodes)) if nodes else []
+    return {
+        "nodes": results,
+        "totals": summarize(results),
+        "elapsed_s": round(time.monotonic() - t0, 3),
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def summarize(results):
+    """Totais da frota; nós com erro entram só nas contagens de nós."""
+    totals = {
+        "nodes": len(results),
+        "nodes_ok": sum(1 for r in results if r["ok"]),
+        "wallet_balance": 0,
+        "channel_balance": 0,
+        "total_balance": 0,
+        "number_of_channels": 0,
+        "num_active_channels": 0,
+        "synced_to_chain": 0,
+        "bitcoind_synced": 0,
+        "fees_day_sat": 0,
+        "fees_week_sat": 0,
+        "fees_month_sat": 0,
+    }
+    for r in results:
+        lnd, btc = r["lnd"], r["bitcoin"]
+        for key in ("wallet_balance", "channel_balance", "total_balance",
+                    "number_of_channels", "num_active_channels"):
+            totals[key] += int(lnd.get(key) or 0)
+        if lnd.get("synced_to_chain"):
+            totals["synced_to_chain"] += 1
+        if (btc.get("sync_percentage") or 0) >= 99.99:
+            totals["bitcoind_synced"] += 1
+        fees = lnd.get("fees") or {}
+        totals["fees_day_sat"] += fees.get("day_sat", 0)
+        totals["fees_week_sat"] += fees.get("week_sat", 0)
+        totals["fees_month_sat"] += fees.get("month_sat", 0)
+    return totals
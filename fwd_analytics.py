@@ -0,0 +1,306 @@
+"""
+Análise vetorizada do fwdinghistory com NumPy.
+
+Os eventos viram colunas (arrays int64/uint64) e todas as agregações são
+feitas com bincount / sort / searchsorted, sem laços Python por evento:
+  - distribuição da taxa efetiva (ppm = fee / amt_out * 1e6)
+  - histograma de valores encaminhados
+  - percentis de ppm por peer de saída
+  - matriz de fluxo peer de entrada -> peer de saída
+
+NumPy é dependência opcional: só é importado quando a análise roda.
+"""
+import threading
+from operator import itemgetter
+
+# Faixas de ppm e de valor (sats) usadas nos histogramas
+PPM_EDGES = [0, 1, 10, 50, 100, 250, 500, 1000, 2500, 5000]
+AMOUNT_EDGES_SAT = [0, 1000, 10000, 100000, 1000000, 10000000, 100000000]
+PERCENTILES = [10, 25, 50, 75, 90, 99]
+
+# Janela máxima aceita pela rota; eventos mais antigos saem do store
+MAX_WINDOW_S = 365 * 86400
+
+# Colunas numéricas guardadas (os canais viram códigos int32, ver _ChanCodes)
+_INT_FIELDS = (("timestamp", None), ("amt_out_msat", "amt_out"), ("fee_msat", None))
+
+
+class _ChanCodes(dict):
+    """chan_id (str) -> código sequencial; códigos novos nascem no primeiro acesso."""
+
+    def __missing__(self, key):
+        code = self[key] = len(self)
+        return code
+
+
+def _int_column(np, events, field, alt):
+    """
+    Uma coluna uint64-como-string do lncli convertida em C por np.fromstring
+    (bem mais rápido que int() por evento). Se faltar campo ou vier algo fora
+    do padrão, cai para o caminho lento; `alt` é o nome antigo em sats.
+    """
+    n = len(events)
+    try:
+        arr = np.fromstring(" ".join(map(itemgetter(field), events)), dtype=np.int64, sep=" ")
+        if arr.size == n:
+            return arr
+    except (KeyError, TypeError, ValueError):
+        pass
+    if alt is None:
+        it = (int(e.get(field) or 0) for e in events)
+    else:
+        it = (int(e.get(field) or int(e.get(alt) or 0) * 1000) for e in events)
+    return np.fromiter(it, dtype=np.int64, count=n)
+
+
+def _chan_column(np, events, field, code):
+    """Coluna de chan_id convertida em códigos int32 (ver _ChanCodes)."""
+    try:
+        it = map(code, map(itemgetter(field), events))
+        return np.fromiter(it, dtype=np.int32, count=len(events))
+    except KeyError:
+        it = map(code, (str(e.get(field, "0")) for e in events))
+        return np.fromiter(it, dtype=np.int32, count=len(events))
+
+
+class ForwardingStore:
+    """
+    Colunas do fwdinghistory mantidas entre chamadas.
+
+    O index_offset do lncli é relativo ao start_time da consulta, então o
+    store fixa um `anchor` (start_time) e guarda quantos eventos já leu a
+    partir dele: uma nova consulta só busca e converte os eventos novos.
+    Cada evento é convertido uma única vez; canais viram códigos int32, o
+    que poupa o np.unique sobre 2N chan_ids na análise.
+
+    Pedido de janela mais antiga que o anchor reconstrói do zero; eventos
+    com mais de MAX_WINDOW_S são descartados (anchor avança).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, anchor):
+        self.anchor = anchor
+        self.offset = 0
+        self._codes = _ChanCodes()
+        self._chunks = []     # lista de dicts de colunas (uma por página)
+        self._cols = None     # concatenação em cache
+
+    def append(self, events):
+        """Converte uma página de eventos e acrescenta ao store."""
+        import numpy as np
+
+        if not events:
+            return
+        chunk = {field: _int_column(np, events, field, alt) for field, alt in _INT_FIELDS}
+        code = self._codes.__getitem__
+        chunk["chan_in"] = _chan_column(np, events, "chan_id_in", code)
+        chunk["chan_out"] = _chan_column(np, events, "chan_id_out", code)
+        self._chunks.append(chunk)
+        self._cols = None
+
+    def _columns(self):
+        import numpy as np
+
+        if self._cols is None:
+            if not self._chunks:
+                empty = {f: np.empty(0, dtype=np.int64) for f, _ in _INT_FIELDS}
+                empty.update(chan_in=np.empty(0, dtype=np.int32), chan_out=np.empty(0, dtype=np.int32))
+                self._chunks = [empty]
+            if len(self._chunks) > 1:
+                self._chunks = [{k: np.concatenate([c[k] for c in self._chunks]) for k in self._chunks[0]}]
+            self._cols = self._chunks[0]
+        return self._cols
+
+    def _trim(self, end_ts):
+        """Avança o anchor descartando eventos mais antigos que a janela máxima."""
+        import numpy as np
+
+        new_anchor = end_ts - MAX_WINDOW_S
+        if self.anchor is None or new_anchor <= self.anchor:
+            return
+        cols = self._columns()
+        cut = int(np.searchsorted(cols["timestamp"], new_anchor, side="left"))
+        self._chunks = [{k: v[cut:].copy() for k, v in cols.items()}]
+        self._cols = None
+        self.offset -= cut
+        self.anchor = new_anchor
+
+    def window(self, start_ts, end_ts, iter_pages):
+        """
+        Atualiza o store e devolve as colunas de [start_ts, end_ts] (views).
+        `iter_pages(anchor, end_ts, offset)` gera (eventos, próximo_offset).
+        """
+        import numpy as np
+
+        with self._lock:
+            if self.anchor is None or start_ts < self.anchor:
+                self._reset(start_ts)
+            for events, next_offset in iter_pages(self.anchor, end_ts, self.offset):
+                self.append(events)
+                self.offset = next_offset
+            self._trim(end_ts)
+
+            cols = self._columns()
+            ts = cols["timestamp"]
+            lo = int(np.searchsorted(ts, start_ts, side="left"))
+            hi = int(np.searchsorted(ts, end_ts, side="right"))
+            out = {k: v[lo:hi] for k, v in cols.items()}
+            out["chan_ids"] = list(self._codes)
+            return out
+
+
+def to_columns(events):
+    """Colunas de uma lista avulsa de eventos (sem reaproveitar entre chamadas)."""
+    store = ForwardingStore()
+    store.append(events)
+    cols = store._columns()
+    return dict(cols, chan_ids=list(store._codes))
+
+
+def channel_ids(cols):
+    """Chan_ids (str) que aparecem nas colunas, para resolver pubkeys."""
+    import numpy as np
+
+    n = len(cols["chan_ids"])
+    seen = (np.bincount(cols["chan_in"], minlength=n) + np.bincount(cols["chan_out"], minlength=n)) > 0
+    return [cols["chan_ids"][i] for i in np.flatnonzero(seen).tolist()]
+
+
+def _grouped_percentiles(np, groups, values, n_groups, pcts):
+    """
+    Percentis (interpolação linear, igual ao np.percentile) por grupo sem
+    laço por grupo: ordena por valor e depois, de forma estável, por grupo
+    (códigos uint16 usam radix sort; bem mais rápido que np.lexsort e
+    exato, ao contrário de uma chave combinada em float).
+    Retorna matriz (n_groups, len(pcts)); NaN para grupos vazios.
+    """
+    order = np.argsort(values)
+    codes = groups.astype(np.uint16 if n_groups <= 0xFFFF else np.int64)[order]
+    order = order[np.argsort(codes, kind="stable")]
+    ordered = values[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    out = np.full((n_groups, len(pcts)), np.nan)
+    nonempty = counts > 0
+    s = starts[nonempty]
+    c = counts[nonempty]
+    for j, p in enumerate(pcts):
+        pos = (c - 1) * (p / 100.0)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, c - 1)
+        frac = pos - lo
+        out[nonempty, j] = ordered[s + lo] * (1 - frac) + ordered[s + hi] * frac
+    return out
+
+
+def _histogram(np, values, edges):
+    idx = np.searchsorted(np.asarray(edges), values, side="right") - 1
+    counts = np.bincount(idx, minlength=len(edges))
+    labels = [f"{edges[i]}-{edges[i + 1]}" for i in range(len(edges) - 1)] + [f"{edges[-1]}+"]
+    return [{"range": label, "count": int(cnt)} for label, cnt in zip(labels, counts)]
+
+
+def analyze(cols, peer_of_chan, alias_of, top=20):
+    """
+    Calcula distribuições, percentis por peer e fluxos.
+
+    `peer_of_chan`: dict chan_id (str) -> pubkey (ou None se desconhecido)
+    `alias_of`: função pubkey -> alias exibível
+    """
+    import numpy as np
+
+    fee = cols["fee_msat"]
+    amt_out = cols["amt_out_msat"]
+    n = int(fee.size)
+    if n == 0:
+        return {"total_events": 0, "ppm": None, "amount_hist": [], "peers": [], "flows": []}
+
+    ppm = np.where(amt_out > 0, fee * 1e6 / np.maximum(amt_out, 1), 0.0)
+
+    # Canais -> índice de peer (pubkey); canais sem pubkey viram peer próprio
+    chan_ids = cols["chan_ids"]
+    peer_keys = []
+    peer_index = {}
+    chan_peer = np.empty(len(chan_ids), dtype=np.int64)
+    for i, chan in enumerate(chan_ids):
+        key = peer_of_chan.get(chan) or f"chan:{chan}"
+        if key not in peer_index:
+            peer_index[key] = len(peer_keys)
+            peer_keys.append(key)
+        chan_peer[i] = peer_index[key]
+    n_peers = len(peer_keys)
+    g_in = chan_peer[cols["chan_in"]]
+    g_out = chan_peer[cols["chan_out"]]
+
+    def label(key):
+        return key if key.startswith("chan:") else alias_of(key)
+
+    # Distribuição global
+    pct_values = np.percentile(ppm, PERCENTILES)
+    total_fee = int(fee.sum())
+    total_amt = int(amt_out.sum())
+    ppm_summary = {
+        "weighted_mean": round(total_fee * 1e6 / total_amt, 2) if total_amt else 0.0,
+        "percentiles": {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, pct_values)},
+        "histogram": _histogram(np, ppm, PPM_EDGES),
+    }
+    amount_hist = _histogram(np, amt_out // 1000, AMOUNT_EDGES_SAT)
+
+    # Por peer de saída
+    fees_by_peer = np.bincount(g_out, weights=fee, minlength=n_peers)
+    amt_by_peer = np.bincount(g_out, weights=amt_out, minlength=n_peers)
+    events_by_peer = np.bincount(g_out, minlength=n_peers)
+    pct_by_peer = _grouped_percentiles(np, g_out, ppm, n_peers, PERCENTILES)
+    ranked = np.argsort(-fees_by_peer, kind="stable")
+    ranked = ranked[events_by_peer[ranked] > 0][:top]
+    peers = [
+        {
+            "alias": label(peer_keys[i]),
+            "pub_key": None if peer_keys[i].startswith("chan:") else peer_keys[i],
+            "events": int(events_by_peer[i]),
+            "fees_sat": int(fees_by_peer[i]) // 1000,
+            "amount_sat": int(amt_by_peer[i]) // 1000,
+            "weighted_ppm": round(float(fees_by_peer[i] * 1e6 / amt_by_peer[i]), 2) if amt_by_peer[i] else 0.0,
+            "ppm_percentiles": {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, pct_by_peer[i])},
+        }
+        for i in ranked.tolist()
+    ]
+
+    # Fluxos entrada -> saída (só pares que ocorreram). Com poucos peers o
+    # par cabe num bincount direto; senão, np.unique.
+    pair = g_in * n_peers + g_out
+    if n_peers * n_peers <= (1 << 22):
+        flow_events = np.bincount(pair, minlength=n_peers * n_peers)
+        pairs = np.flatnonzero(flow_events)
+        flow_events = flow_events[pairs]
+        flow_amt = np.bincount(pair, weights=amt_out, minlength=n_peers * n_peers)[pairs]
+        flow_fee = np.bincount(pair, weights=fee, minlength=n_peers * n_peers)[pairs]
+    else:
+        pairs, pair_inv = np.unique(pair, return_inverse=True)
+        flow_amt = np.bincount(pair_inv, weights=amt_out)
+        flow_fee = np.bincount(pair_inv, weights=fee)
+        flow_events = np.bincount(pair_inv)
+    top_flows = np.argsort(-flow_amt, kind="stable")[:top]
+    flows = [
+        {
+            "from": label(peer_keys[int(pairs[k]) // n_peers]),
+            "to": label(peer_keys[int(pairs[k]) % n_peers]),
+            "events": int(flow_events[k]),
+            "amount_sat": int(flow_amt[k]) // 1000,
+            "fees_sat": int(flow_fee[k]) // 1000,
+        }
+        for k in top_flows.tolist()
+    ]
+
+    return {
+        "total_events": n,
+        "total_fees_sat": total_fee // 1000,
+        "total_amount_sat": total_amt // 1000,
+        "ppm": ppm_summary,
+        "amount_hist": amount_hist,
+        "peers": peers,
+        "flows": flows,
+    }
@@ -0,0 +1,327 @@
+"""
+Histórico de liquidez dos canais em arquivo append-only com deltas.
+
+Cada snapshot grava só os canais cujo saldo mudou desde o snapshot
+anterior, como deltas (varint zigzag) de local/remote. O tamanho cresce com
+a quantidade de mudanças, não com canais x amostras.
+
+Formato (tudo varint sem sinal, exceto onde indicado):
+
+  'C' idx chan_id capacity len(pubkey) pubkey   -> canal novo (índice local)
+  'S' ts n  n x [ (idx<<1)|fechado, zz(dlocal), zz(dremote) ]
+                                                 -> snapshot (sem deltas se fechado)
+
+Um registro incompleto no fim do arquivo (queda no meio da escrita) é
+descartado e o arquivo truncado no último registro válido ao abrir.
+
+O arquivo é lido uma vez ao abrir; depois disso as consultas usam os
+pontos de cada canal em memória (array de int64), atualizados em record().
+"""
+import bisect
+import math
+import os
+import threading
+import time
+from array import array
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_HISTORY_PATH = os.environ.get("LIQUIDITY_HISTORY_PATH", str(BASE_DIR / "liquidity_history.bin"))
+
+_REC_CHANNEL = ord("C")
+_REC_SNAPSHOT = ord("S")
+
+# Ponto de fechamento na curva em memória (saldo não existe mais)
+_CLOSED = -1
+
+
+# -----------------------------
+# Codificação
+# -----------------------------
+def _put_uvarint(buf, value):
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _put_svarint(buf, value):
+    _put_uvarint(buf, (value << 1) ^ (value >> 63) if value < 0 else value << 1)
+
+
+def _get_uvarint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _get_svarint(data, pos):
+    raw, pos = _get_uvarint(data, pos)
+    return (raw >> 1) ^ -(raw & 1), pos
+
+
+def _replay(data):
+    """
+    Percorre o arquivo gerando eventos:
+      ("C", idx, chan_id, capacity, pubkey)
+      ("S", ts, [(idx, closed, dlocal, dremote), ...])
+    Para no primeiro registro incompleto; o último item é o offset válido.
+    """
+    pos = 0
+    end = len(data)
+    while pos < end:
+        start = pos
+        try:
+            kind = data[pos]
+            pos += 1
+            if kind == _REC_CHANNEL:
+                idx, pos = _get_uvarint(data, pos)
+                chan_id, pos = _get_uvarint(data, pos)
+                capacity, pos = _get_uvarint(data, pos)
+                size, pos = _get_uvarint(data, pos)
+                if pos + size > end:
+                    raise IndexError
+                pubkey = data[pos:pos + size].decode()
+                pos += size
+                yield ("C", idx, chan_id, capacity, pubkey)
+            elif kind == _REC_SNAPSHOT:
+                ts, pos = _get_uvarint(data, pos)
+                n, pos = _get_uvarint(data, pos)
+                entries = []
+                for _ in range(n):
+                    tag, pos = _get_uvarint(data, pos)
+                    if tag & 1:
+                        entries.append((tag >> 1, True, 0, 0))
+                        continue
+                    dlocal, pos = _get_svarint(data, pos)
+                    dremote, pos = _get_svarint(data, pos)
+                    entries.append((tag >> 1, False, dlocal, dremote))
+                yield ("S", ts, entries)
+            else:
+                raise ValueError(f"registro desconhecido {kind!r}")
+        except (IndexError, ValueError, UnicodeDecodeError):
+            yield ("END", start)
+            return
+    yield ("END", end)
+
+
+class LiquidityHistory:
+    """
+    Grava snapshots de listchannels com cadência mínima de `cadence` segundos
+    e responde curvas de saldo e canais esgotados a partir da memória.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH, cadence=600):
+        self.path = path
+        self.cadence = cadence
+        self._lock = threading.Lock()
+        self._index = {}      # chan_id (int) -> idx
+        self._channels = {}   # idx -> {"chan_id", "capacity", "pubkey"}
+        self._state = {}      # idx -> (local, remote) dos canais abertos
+        self._points = {}     # idx -> array("q") com ts, local, remote (por mudança)
+        self._last_ts = 0
+        self._load()
+
+    def _read(self):
+        try:
+            with open(self.path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return b""
+
+    def _apply(self, ts, idx, closed, local, remote):
+        """Registra uma mudança do canal no estado e na curva em memória."""
+        points = self._points.get(idx)
+        if points is None:
+            points = self._points[idx] = array("q")
+        if closed:
+            self._state.pop(idx, None)
+            points.extend((ts, _CLOSED, _CLOSED))
+        else:
+            self._state[idx] = (local, remote)
+            points.extend((ts, local, remote))
+
+    def _load(self):
+        data = self._read()
+        valid = 0
+        for ev in _replay(data):
+            if ev[0] == "C":
+                _, idx, chan_id, capacity, pubkey = ev
+                self._index[chan_id] = idx
+                self._channels[idx] = {"chan_id": chan_id, "capacity": capacity, "pubkey": pubkey}
+            elif ev[0] == "S":
+                _, ts, entries = ev
+                self._last_ts = ts
+                for idx, closed, dlocal, dremote in entries:
+                    if idx not in self._channels:
+                        # canal cujo registro 'C' se perdeu (arquivo gravado por versão antiga)
+                        continue
+                    local, remote = self._state.get(idx, (0, 0))
+                    self._apply(ts, idx, closed, local + dlocal, remote + dremote)
+            else:
+                valid = ev[1]
+        if valid < len(data):
+            # Cauda corrompida (escrita interrompida): descarta
+            with open(self.path, "r+b") as f:
+                f.truncate(valid)
+
+    def next_due(self):
+        """Instante (epoch) a partir do qual o próximo snapshot é aceito."""
+        return math.ceil(self._last_ts + self.cadence)
+
+    def _append(self, buf):
+        """
+        Acrescenta `buf` ao arquivo por inteiro ou nada: se a escrita falhar
+        no meio (ex.: disco cheio), volta o arquivo ao tamanho anterior, já
+        que um registro parcial faria o _load descartar tudo depois dele.
+        """
+        with open(self.path, "ab", buffering=0) as f:
+            start = f.seek(0, os.SEEK_END)
+            try:
+                view = memoryview(buf)
+                while view:
+                    view = view[f.write(view):]
+            except BaseException:
+                f.truncate(start)
+                raise
+
+    def record(self, channels, ts=None, force=False):
+        """
+        Grava um snapshot a partir de listchannels["channels"].
+        Respeita a cadência (a menos que force=True). Retorna bytes gravados.
+        """
+        ts = int(ts if ts is not None else time.time())
+        with self._lock:
+            if not force and ts - self._last_ts < self.cadence:
+                return 0
+
+            buf = bytearray()
+            entries = bytearray()
+            changes = []
+            new_channels = {}   # chan_id -> (idx, info), aplicados só após a escrita
+            seen = set()
+            for ch in channels:
+                try:
+                    chan_id = int(ch.get("chan_id"))
+                    local = int(ch.get("local_balance", 0) or 0)
+                    remote = int(ch.get("remote_balance", 0) or 0)
+                except (TypeError, ValueError):
+                    continue
+                idx = self._index.get(chan_id)
+                if idx is None and chan_id in new_channels:
+                    idx = new_channels[chan_id][0]
+                elif idx is None:
+                    idx = len(self._channels) + len(new_channels)
+                    capacity = int(ch.get("capacity", 0) or 0)
+                    pubkey = (ch.get("remote_pubkey") or "").encode()
+                    buf.append(_REC_CHANNEL)
+                    _put_uvarint(buf, idx)
+                    _put_uvarint(buf, chan_id)
+                    _put_uvarint(buf, capacity)
+                    _put_uvarint(buf, len(pubkey))
+                    buf += pubkey
+                    new_channels[chan_id] = (idx, {"chan_id": chan_id, "capacity": capacity,
+                                                   "pubkey": pubkey.decode()})
+                seen.add(idx)
+                prev_local, prev_remote = self._state.get(idx, (0, 0))
+                if idx in self._state and (local, remote) == (prev_local, prev_remote):
+                    continue
+                _put_uvarint(entries, idx << 1)
+                _put_svarint(entries, local - prev_local)
+                _put_svarint(entries, remote - prev_remote)
+                changes.append((idx, False, local, remote))
+
+            for idx in [i for i in self._state if i not in seen]:
+                _put_uvarint(entries, (idx << 1) | 1)
+                changes.append((idx, True, 0, 0))
+
+            buf.append(_REC_SNAPSHOT)
+            _put_uvarint(buf, ts)
+            _put_uvarint(buf, len(changes))
+            buf += entries
+
+            self._append(buf)
+            # Memória só muda depois que o registro foi gravado
+            for chan_id, (idx, info) in new_channels.items():
+                self._index[chan_id] = idx
+                self._channels[idx] = info
+            for idx, closed, local, remote in changes:
+                self._apply(ts, idx, closed, local, remote)
+            self._last_ts = ts
+            return len(buf)
+
+    def curve(self, chan_id, since=None):
+        """
+        Curva de saldo do canal: lista de pontos {ts, local, remote} nos
+        instantes em que o saldo mudou (função degrau entre os pontos).
+        """
+        with self._lock:
+            idx = self._index.get(int(chan_id))
+            raw = self._points.get(idx)
+            raw = array("q", raw) if raw is not None else array("q")
+        ts_list = raw[0::3]
+        start = 0
+        points = []
+        if since is not None:
+            start = bisect.bisect_left(ts_list, since)
+            if start > 0:
+                # mantém o último ponto anterior a `since` como valor inicial
+                start -= 1
+        for i in range(start, len(ts_list)):
+            ts, local, remote = raw[3 * i:3 * i + 3]
+            if local == _CLOSED:
+                points.append({"ts": ts, "local": None, "remote": None, "closed": True})
+            else:
+                points.append({"ts": ts, "local": local, "remote": remote})
+        if since is not None and points and points[0]["ts"] < since:
+            points[0]["ts"] = since
+        return points
+
+    def depleted(self, hours, threshold=0.05, side="local"):
+        """
+        Canais abertos cujo saldo do lado `side` está <= threshold x capacidade
+        desde pelo menos `hours` horas (até o último snapshot).
+        """
+        side_i = 1 if side == "local" else 2
+        result = []
+        with self._lock:
+            last_ts = self._last_ts
+            for idx, (local, remote) in self._state.items():
+                ch = self._channels[idx]
+                limit = threshold * (ch["capacity"] or 1)
+                points = self._points[idx]
+                # Volta pelos pontos enquanto o canal seguia abaixo do limite
+                since = None
+                for i in range(len(points) - 3, -1, -3):
+                    if points[i + side_i] == _CLOSED or points[i + side_i] > limit:
+                        break
+                    since = points[i]
+                if since is None:
+                    continue
+                duration_h = (last_ts - since) / 3600.0
+                if duration_h >= hours:
+                    result.append({
+                        "chan_id": str(ch["chan_id"]),
+                        "pub_key": ch["pubkey"],
+                        "capacity": ch["capacity"],
+                        "local_balance": local,
+                        "remote_balance": remote,
+                        "depleted_since": since,
+                        "depleted_hours": round(duration_h, 2),
+                    })
+        result.sort(key=lambda r: -r["depleted_hours"])
+        return result
+
+    def stats(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        return {"bytes": size, "channels_known": len(self._channels),
+                "channels_open": len(self._state), "last_snapshot": self._last_ts or None}
@@ -1,20 +1,29 @@
 import configparser
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, url_for, redirect, Response
+import mimetypes
 import subprocess
 import json
-import requests
-import psutil
-import cpuinfo
-import sensors
+import threading
+import time
 from collections import defaultdict
-import markdown
 import os
 import shutil
 from datetime import datetime, timedelta, date
 from zoneinfo import ZoneInfo
 
 # para usar o viewer do lnd_fees.sqlite (jvx)
-from lnd_fees_view import fetch_daily_latest, fetch_month_summary, fetch_ytd
+from lnd_fees_view import fetch_daily_latest, fetch_month_summary, fetch_ytd, DB_PATH as LND_FEES_DB_PATH
+from alias_cache import AliasCache, DEFAULT_CACHE_PATH as DEFAULT_ALIAS_CACHE_PATH
+from singleflight import SingleFlight
+import fwd_analytics
+import node_info
+import fleet
+from assets import AssetManifest, accepted_encodings, gzip_body
+from liquidity_history import LiquidityHistory, DEFAULT_HISTORY_PATH as DEFAULT_LIQUIDITY_PATH
+from refresh import RefreshScheduler
+
+# requests, psutil, cpuinfo, sensors e markdown são importados dentro dos
+# coletores que os usam: o processo sobe rápido e o custo fica no warm-up.
 
 # -----------------------------
 # Config
@@ -38,7 +47,65 @@ UMBREL_PATH = config.get('umbrel', 'UMBREL_PATH', fallback='/path/to/umbrel/scri
 # Mensagem custom
 MESSAGE_FILE_PATH = config.get('settings', 'MESSAGE_FILE_PATH', fallback='/home/admin/node-status/templates/message.txt')
 
+# Cache de aliases/pubkeys dos peers (usado no Top Peers)
+ALIAS_CACHE_PATH      = config.get('settings', 'ALIAS_CACHE_PATH', fallback=DEFAULT_ALIAS_CACHE_PATH)
+ALIAS_CACHE_TTL_HOURS = config.getfloat('settings', 'ALIAS_CACHE_TTL_HOURS', fallback=24)
+
+# Histórico de liquidez dos canais (snapshots a cada N minutos; 0 desliga)
+LIQUIDITY_HISTORY_PATH = config.get('settings', 'LIQUIDITY_HISTORY_PATH', fallback=DEFAULT_LIQUIDITY_PATH)
+LIQUIDITY_CADENCE_MIN  = config.getfloat('settings', 'LIQUIDITY_CADENCE_MIN', fallback=10)
+
+# Coalescência das rotas caras: requisições iguais e simultâneas dividem uma
+# única execução e o resultado fica em cache por alguns segundos.
+# Ajustável por comando em [coalescing]: <NOME>_TTL, <NOME>_MAX_CONCURRENCY e
+# <NOME>_STALE (por quanto tempo o snapshot do warm-up ainda é servido enquanto
+# recalcula em background; é o que faz o warm-up valer para o primeiro /status.
+# Só o snapshot do warm-up: depois do primeiro recálculo vale apenas o TTL).
+def _result_ok(result):
+    return not (isinstance(result, dict) and result.get("error"))
+
+def _flight(name, ttl, max_concurrency, stale=0):
+    return SingleFlight(
+        ttl=config.getfloat('coalescing', f'{name}_TTL', fallback=ttl),
+        max_concurrency=config.getint('coalescing', f'{name}_MAX_CONCURRENCY', fallback=max_concurrency),
+        cacheable=_result_ok,
+        stale=config.getfloat('coalescing', f'{name}_STALE', fallback=stale),
+    )
+
+flights = {
+    "bitcoin":   _flight('BITCOIN',   ttl=5,  max_concurrency=1, stale=900),
+    "lnd":       _flight('LND',       ttl=5,  max_concurrency=1, stale=900),
+    # Cascata de fontes externas; offline chega a ~22 s até o fallback estático
+    "fees":      _flight('FEES',      ttl=300, max_concurrency=1, stale=3600),
+    "top_peers": _flight('TOP_PEERS', ttl=30, max_concurrency=1),
+    "lnd_fees":  _flight('LND_FEES',  ttl=10, max_concurrency=2),
+    "fwd_analytics": _flight('FWD_ANALYTICS', ttl=60, max_concurrency=1),
+    "fleet":     _flight('FLEET',     ttl=10, max_concurrency=1),
+    "message":   _flight('MESSAGE',   ttl=60, max_concurrency=1),
+}
+
+# Refresh por eventos (ver refresh.py). Fontes vazias ficam desligadas;
+# o poll de segurança (FALLBACK_S) e o watch de arquivos rodam sempre.
+REFRESH_DEBOUNCE_S  = config.getfloat('refresh', 'DEBOUNCE_S',  fallback=2)
+REFRESH_FALLBACK_S  = config.getfloat('refresh', 'FALLBACK_S',  fallback=900)
+REFRESH_EVENT_TTL_S = config.getfloat('refresh', 'EVENT_TTL_S', fallback=300)
+REFRESH_FILE_POLL_S = config.getfloat('refresh', 'FILE_POLL_S', fallback=2)
+ZMQ_HASHBLOCK       = config.get('refresh', 'ZMQ_HASHBLOCK', fallback='')
+ZMQ_RAWTX           = config.get('refresh', 'ZMQ_RAWTX',     fallback='')
+RAWTX_DEBOUNCE_S    = config.getfloat('refresh', 'RAWTX_DEBOUNCE_S', fallback=30)
+LND_REST_URL        = config.get('refresh', 'LND_REST_URL',      fallback='')
+LND_MACAROON_PATH   = config.get('refresh', 'LND_MACAROON_PATH', fallback='') or None
+LND_TLS_CERT_PATH   = config.get('refresh', 'LND_TLS_CERT_PATH', fallback='') or None
+LND_STREAM_TIMEOUT_S = config.getfloat('refresh', 'LND_STREAM_TIMEOUT_S', fallback=0)
+
+# Modo frota: seções [node:<nome>] no config (ver fleet.py)
+FLEET_NODES = fleet.load_nodes(config)
+
+# Respostas HTML/JSON acima deste tamanho (bytes) saem com gzip; 0 desliga
+GZIP_MIN_SIZE = config.getint('settings', 'GZIP_MIN_SIZE', fallback=1024)
+
 app = Flask(__name__)
+asset_manifest = AssetManifest(os.path.join(app.root_path, 'static'))
 
 # -----------------------------
 # Helpers robustos
@@ -56,11 +123,24 @@ def run_command(command, timeout=5):
     except Exception as e:
         raise RuntimeError(str(e))
 
+alias_cache = AliasCache(run_command, path=ALIAS_CACHE_PATH, ttl=ALIAS_CACHE_TTL_HOURS * 3600)
+# Colunas do fwdinghistory mantidas entre chamadas (só eventos novos são lidos)
+forwarding_store = fwd_analytics.ForwardingStore()
+
+liquidity = (LiquidityHistory(LIQUIDITY_HISTORY_PATH, cadence=LIQUIDITY_CADENCE_MIN * 60)
+             if LIQUIDITY_CADENCE_MIN > 0 else None)
+
+def _lncli_base_cmd():
+    """Comando base do lncli conforme o ambiente (minibolt ou umbrel)."""
+    return node_info.lncli_base_cmd(RUNNING_ENVIRONMENT, UMBREL_PATH)
+
+@flights["message"].wrap
 def read_message_from_file():
     try:
         with open(MESSAGE_FILE_PATH, 'r') as file:
             message = file.read().strip()
         # Markdown -> HTML
+        import markdown
         return markdown.markdown(message)
     except FileNotFoundError:
         return "No message found."
@@ -69,6 +149,7 @@ def read_message_from_file():
 
 def _http_json(url, timeout=5):
     """GET JSON com requests; retorna dict ou lança."""
+    import requests
     r = requests.get(url, timeout=timeout, headers={"User-Agent": "node-status/1.0"})
     r.raise_for_status()
     return r.json()
@@ -85,6 +166,7 @@ def _torsocks_curl_json(url, timeout=10):
         raise RuntimeError(f"torsocks curl falhou: {out.stderr.strip()}")
     return json.loads(out.stdout)
 
+@flights["fees"].wrap
 def get_fee_info():
     """
     Busca taxas com estratégia em cascata:
@@ -121,18 +203,31 @@ def get_fee_info():
         }
 
 def get_cpu_usage():
+    import psutil
     # não bloquear 1s por request
     return psutil.cpu_percent(interval=0.0)
 
 def get_memory_usage():
     try:
+        import psutil
         return psutil.virtual_memory().percent
     except Exception:
         return None
 
+_cpu_info_cache = None
+
 def get_cpu_info():
+    """
+    cpuinfo é lento (segundos em um Pi) e o resultado não muda enquanto o
+    processo vive: só a primeira chamada bem-sucedida paga o custo.
+    """
+    global _cpu_info_cache
+    if _cpu_info_cache is not None:
+        return _cpu_info_cache
     try:
-        return cpuinfo.get_cpu_info()
+        import cpuinfo
+        _cpu_info_cache = cpuinfo.get_cpu_info()
+        return _cpu_info_cache
     except Exception:
         return {"error": "cpuinfo failed"}
 
@@ -142,6 +237,7 @@ def get_physical_disks_usage():
     Nunca lança exceção; retorna estrutura com percent calculado.
     """
     try:
+        import psutil
         disk_usage = defaultdict(lambda: {'total': 0, 'used': 0, 'free': 0})
         for part in psutil.disk_partitions(all=False):
             dev = getattr(part, "device", "") or ""
@@ -170,6 +266,7 @@ def get_cpu_temp():
     Tenta coretemp/k10temp e labels Package id 0/Tctl/Tdie.
     """
     try:
+        import psutil
         temps = psutil.sensors_temperatures(fahrenheit=False) or {}
     except Exception:
         return None
@@ -197,6 +294,7 @@ def get_sensor_temperatures():
     Nunca derruba a rota; retorna lista de tuplas (chip, label, value) ou erro.
     """
     try:
+        import sensors
         sensors.init()
         sensor_temps = []
         for chip in sensors.iter_detected_chips():
@@ -220,117 +318,83 @@ def get_sensor_temperatures():
 # -----------------------------
 # Bitcoin/LND info (com try/except + timeouts)
 # -----------------------------
+@flights["bitcoin"].wrap
 def get_bitcoin_info():
     try:
-        if RUNNING_ENVIRONMENT == 'minibolt' and RUNNING_BITCOIN == 'external':
-            rpc_host = BITCOIN_RPC_HOST
-            bitcoin_cli_base_cmd = [
-                'bitcoin-cli',
-                f'-rpcuser={BITCOIN_RPC_USER}',
-                f'-rpcpassword={BITCOIN_RPC_PASS}',
-                f'-rpcconnect={rpc_host}',
-                f'-rpcport={BITCOIN_RPC_PORT}'
-            ]
-            blockchain_info_cmd = bitcoin_cli_base_cmd + ['getblockchaininfo']
-            peers_info_cmd      = bitcoin_cli_base_cmd + ['getpeerinfo']
-            network_info_cmd    = bitcoin_cli_base_cmd + ['getnetworkinfo']
-        elif RUNNING_ENVIRONMENT == 'minibolt' and RUNNING_BITCOIN == 'local':
-            rpc_host = 'LOCAL - Minibolt'
-            bitcoin_cli_base_cmd = ['bitcoin-cli']
-            blockchain_info_cmd = bitcoin_cli_base_cmd + ['getblockchaininfo']
-            peers_info_cmd      = bitcoin_cli_base_cmd + ['getpeerinfo']
-            network_info_cmd    = bitcoin_cli_base_cmd + ['getnetworkinfo']
-        else:  # umbrel
-            rpc_host = 'LOCAL - Umbrel'
-            blockchain_info_cmd = [f"{UMBREL_PATH}app", "compose", "bitcoin", "exec", "bitcoind", "bitcoin-cli", 'getblockchaininfo']
-            peers_info_cmd      = [f"{UMBREL_PATH}app", "compose", "bitcoin", "exec", "bitcoind", "bitcoin-cli", 'getpeerinfo']
-            network_info_cmd    = [f"{UMBREL_PATH}app", "compose", "bitcoin", "exec", "bitcoind", "bitcoin-cli", 'getnetworkinfo']
-
-        blockchain_data = json.loads(run_command(blockchain_info_cmd, timeout=4))
-        peers_data      = json.loads(run_command(peers_info_cmd,      timeout=4))
-        network_data    = json.loads(run_command(network_info_cmd,    timeout=4))
-
-        return {
-            "sync_percentage": blockchain_data.get("verificationprogress", 0) * 100,
-            "current_block_height": blockchain_data.get("blocks", 0),
-            "chain": blockchain_data.get("chain", "unknown"),
-            "pruned": blockchain_data.get("pruned", False),
-            "number_of_peers": len(peers_data),
-            "bitcoind": rpc_host,
-            "version": network_data.get("version", "unknown"),
-            "subversion": network_data.get("subversion", "unknown"),
-            "error": None
-        }
+        base_cmd, label = node_info.bitcoin_cli_base_cmd(
+            RUNNING_ENVIRONMENT, RUNNING_BITCOIN, UMBREL_PATH,
+            BITCOIN_RPC_USER, BITCOIN_RPC_PASS, BITCOIN_RPC_HOST, BITCOIN_RPC_PORT,
+        )
+        results = [json.loads(run_command(base_cmd + [cmd], timeout=4))
+                   for cmd in node_info.BITCOIN_COMMANDS]
+        return node_info.build_bitcoin_info(*results, label)
     except Exception as e:
-        return {
-            "sync_percentage": None,
-            "current_block_height": None,
-            "chain": None,
-            "pruned": None,
-            "number_of_peers": None,
-            "bitcoind": f"error: {e}",
-            "version": None,
-            "subversion": None,
-            "error": str(e)
-        }
+        return node_info.bitcoin_info_error(e)
 
+@flights["lnd"].wrap
 def get_lnd_info():
     try:
-        if RUNNING_ENVIRONMENT == 'minibolt':
-            lncli_cmd = ['lncli']
-        else:
-            lncli_cmd = [f"{UMBREL_PATH}app", "compose", "lightning", "exec", "lnd", "lncli"]
-
-        wallet_balance_data  = json.loads(run_command(lncli_cmd + ['walletbalance'],  timeout=4))
-        channel_balance_data = json.loads(run_command(lncli_cmd + ['channelbalance'], timeout=4))
-        channels_data        = json.loads(run_command(lncli_cmd + ['listchannels'],   timeout=4))
-        peers_data           = json.loads(run_command(lncli_cmd + ['listpeers'],      timeout=4))
-        node_data            = json.loads(run_command(lncli_cmd + ['getinfo'],        timeout=4))
-
-        return {
-            "wallet_balance": int(wallet_balance_data.get("total_balance", 0)),
-            "channel_balance": int(channel_balance_data.get("balance", 0)),
-            "total_balance": int(wallet_balance_data.get("total_balance", 0)) + int(channel_balance_data.get("balance", 0)),
-            "number_of_channels": len(channels_data.get("channels", [])),
-            "number_of_peers": len(peers_data.get("peers", [])),
-            "node_alias": node_data.get("alias", "N/A"),
-            "node_lnd_version": node_data.get("version"),
-            "pub_key": node_data.get("identity_pubkey"),
-            "num_pending_channels": node_data.get("num_pending_channels"),
-            "num_active_channels": node_data.get("num_active_channels"),
-            "num_inactive_channels": node_data.get("num_inactive_channels"),
-            "synced_to_chain": node_data.get("synced_to_chain"),
-            "synced_to_graph": node_data.get("synced_to_graph"),
-            "error": None
-        }
+        lncli_cmd = _lncli_base_cmd()
+        results = [json.loads(run_command(lncli_cmd + [cmd], timeout=4))
+                   for cmd in node_info.LND_COMMANDS]
+        _record_liquidity(results[2].get("channels", []))
+        return node_info.build_lnd_info(*results)
     except Exception as e:
-        return {
-            "wallet_balance": None,
-            "channel_balance": None,
-            "total_balance": None,
-            "number_of_channels": None,
-            "number_of_peers": None,
-            "node_alias": "N/A",
-            "node_lnd_version": None,
-            "pub_key": None,
-            "num_pending_channels": None,
-            "num_active_channels": None,
-            "num_inactive_channels": None,
-            "synced_to_chain": None,
-            "synced_to_graph": None,
-            "error": str(e)
-        }
+        return node_info.lnd_info_error(e)
+
+def _record_liquidity(channels):
+    """Snapshot de saldos por canal (respeita a cadência; nunca derruba o status)."""
+    if liquidity is None:
+        return
+    try:
+        liquidity.record(channels)
+    except Exception:
+        # Histórico é acessório: falha de escrita não pode derrubar o status
+        pass
 
 # -----------------------------
 # Top peers (via lncli fwdinghistory)
 # -----------------------------
+def _iter_forwarding_pages(lncli_cmd, start_ts, end_ts, offset=0, page_size=50000):
+    """
+    Gera as páginas do fwdinghistory da janela como (eventos, próximo_offset),
+    paginando por index_offset (relativo a start_ts) a partir de `offset`.
+    Tenta primeiro sem lookup de alias no LND (resolvemos via alias_cache);
+    versões antigas do lncli não conhecem a flag, então cai para o comando simples.
+    """
+    base = lncli_cmd + [
+        'fwdinghistory',
+        f'--start_time={start_ts}',
+        f'--end_time={end_ts}',
+        f'--max_events={page_size}',
+    ]
+    extra = ['--skip_peer_alias_lookup']
+    while True:
+        cmd = base + extra + [f'--index_offset={offset}']
+        try:
+            fh = json.loads(run_command(cmd, timeout=20))
+        except RuntimeError as e:
+            if not extra or 'skip_peer_alias_lookup' not in str(e):
+                raise
+            extra = []
+            continue
+        page = fh.get("forwarding_events", []) or []
+        next_offset = int(fh.get("last_offset_index", 0) or 0)
+        if page:
+            yield page, max(next_offset, offset)
+        if len(page) < page_size or next_offset <= offset:
+            return
+        offset = next_offset
+
+@flights["top_peers"].wrap
 def get_top_forwarding_peers(days=30, limit=5):
     """
     Calcula top/bottom peers por fees recebidas nos últimos `days` dias.
     Usa somente forwardinghistory do LND (não inclui custo de rebalances).
 
-    Agrupamento por peer_alias_out (alias do peer de saída).
-    Isso evita depender de listchannels/scid e funciona mesmo com canais fechados.
+    Agrupamento por chan_id_out -> pubkey remoto (via alias_cache), então
+    nenhum evento é descartado e peers com o mesmo alias não se misturam.
+    Canais fechados também resolvem, pois o cache inclui closedchannels.
 
     Retorno:
     {
@@ -340,40 +404,55 @@ def get_top_forwarding_peers(days=30, limit=5):
       "top": [
         {
           "alias": "BCash_Is_Trash",
+          "pub_key": "02abc...",
           "fees_sat": 12345,
           "amount_sat": 9876543,
-          "events": 200
+          "amount_in_sat": 8765432,
+          "events": 200,
+          "channels": ["8123...", ...]
         },
         ...
       ],
-      "low": [ ... ]
+      "low": [ ... ],
+      "top_channels": [
+        {"chan_id": "8123...", "pub_key": "02abc...", "alias": "...",
+         "fees_sat": 100, "amount_sat": 5000, "events": 12},
+        ...
+      ]
     }
     """
     try:
-        # 1) Comando base para lncli
-        if RUNNING_ENVIRONMENT == 'minibolt':
-            lncli_cmd = ['lncli']
-        else:
-            lncli_cmd = [f"{UMBREL_PATH}app", "compose", "lightning", "exec", "lnd", "lncli"]
+        lncli_cmd = _lncli_base_cmd()
 
-        # 2) Janela de tempo em epoch (UTC)
+        # 1) Janela de tempo em epoch (UTC)
         now_ts = int(datetime.utcnow().timestamp())
         start_ts = now_ts - days * 86400
 
-        # 3) Histórico de encaminhamentos
-        fh_raw = run_command(
-            lncli_cmd
-            + [
-                'fwdinghistory',
-                f'--start_time={start_ts}',
-                f'--end_time={now_ts}',
-                '--max_events=100000',
-            ],
-            timeout=20,
-        )
-        fh = json.loads(fh_raw)
-        events = fh.get("forwarding_events", []) or []
-        total_events = len(events)
+        # 2) Histórico de encaminhamentos (completo, paginado), agregado por
+        #    canal página a página: só uma página de eventos fica em memória
+        #    (saída: fees/volume; entrada: volume recebido)
+        chans_out = {}
+        chans_in = {}
+        hints = {}
+        total_events = 0
+        for page, _ in _iter_forwarding_pages(lncli_cmd, start_ts, now_ts):
+            total_events += len(page)
+            for ev in page:
+                chan_out = str(ev.get("chan_id_out") or "")
+                chan_in = str(ev.get("chan_id_in") or "")
+                fee_msat = int(ev.get("fee_msat", "0") or "0")
+                amt_out_msat = int(ev.get("amt_out_msat", ev.get("amt_out", "0")) or "0")
+                amt_in_msat = int(ev.get("amt_in_msat", ev.get("amt_in", "0")) or "0")
+
+                c = chans_out.setdefault(chan_out, {"fees_msat": 0, "amt_out_msat": 0, "events": 0})
+                c["fees_msat"] += fee_msat
+                c["amt_out_msat"] += amt_out_msat
+                c["events"] += 1
+                chans_in[chan_in] = chans_in.get(chan_in, 0) + amt_in_msat
+
+                if chan_out not in hints and ev.get("peer_alias_out"):
+                    hints[chan_out] = ev.get("peer_alias_out")
+            del page
 
         if total_events == 0:
             return {
@@ -382,51 +461,39 @@ def get_top_forwarding_peers(days=30, limit=5):
                 "total_events": 0,
                 "top": [],
                 "low": [],
+                "top_channels": [],
             }
 
-        # 4) Agrega por alias de saída (peer_alias_out)
-        peers = {}
-        for ev in events:
-            alias_raw = (ev.get("peer_alias_out") or "").strip()
+        # 3) Resolve canal -> pubkey -> alias pelo cache persistente
+        chan_peer = alias_cache.resolve(lncli_cmd, set(chans_out) | set(chans_in), hints=hints)
 
-            # Ignora peers sem alias útil ou com mensagem de erro do LND
-            if not alias_raw:
-                continue
-            lowered = alias_raw.lower()
-            if lowered.startswith("unable to lookup peeralias"):
-                continue
-            if lowered in ("unknown", "unnamed"):
-                continue
+        # Canais sem pubkey conhecido viram um "peer" próprio, identificado pelo chan_id
+        def peer_key(chan_id):
+            return chan_peer.get(chan_id) or f"chan:{chan_id}"
 
-            alias = alias_raw
-            fee_msat = int(ev.get("fee_msat", "0") or "0")
-            amt_out_msat = int(ev.get("amt_out_msat", ev.get("amt_out", "0")) or "0")
-
-            p = peers.setdefault(
-                alias,
-                {
-                    "fees_msat": 0,
-                    "amt_out_msat": 0,
-                    "events": 0,
-                },
-            )
-            p["fees_msat"] += fee_msat
-            p["amt_out_msat"] += amt_out_msat
-            p["events"] += 1
-
-        # 5) Converte para lista, filtra quem tem fee > 0 e ordena
-        items = []
-        for alias, v in peers.items():
-            items.append(
-                {
-                    "alias": alias,
-                    "fees_sat": v["fees_msat"] // 1000,
-                    "amount_sat": v["amt_out_msat"] // 1000,
-                    "events": v["events"],
-                }
-            )
-
-        positive = [p for p in items if p["fees_sat"] > 0]
+        peers = {}
+        channels = []
+        for chan_id, v in chans_out.items():
+            key = peer_key(chan_id)
+            p = peers.setdefault(key, {"fees_msat": 0, "amt_out_msat": 0, "amt_in_msat": 0,
+                                       "events": 0, "channels": []})
+            p["fees_msat"] += v["fees_msat"]
+            p["amt_out_msat"] += v["amt_out_msat"]
+            p["events"] += v["events"]
+            p["channels"].append(chan_id)
+            channels.append((chan_id, v))
+        for chan_id, amt_in_msat in chans_in.items():
+            p = peers.get(peer_key(chan_id))
+            if p is not None:
+                p["amt_in_msat"] += amt_in_msat
+
+        def display(key):
+            if key.startswith("chan:"):
+                return key
+            return alias_cache.alias(key)
+
+        # 4) Filtra quem tem fee > 0 e ordena (exato, em msat; desempate estável)
+        positive = [(k, v) for k, v in peers.items() if v["fees_msat"] > 0]
         if not positive:
             return {
                 "window_days": days,
@@ -434,11 +501,40 @@ def get_top_forwarding_peers(days=30, limit=5):
                 "total_events": total_events,
                 "top": [],
                 "low": [],
+                "top_channels": [],
             }
 
-        positive_sorted = sorted(positive, key=lambda x: x["fees_sat"], reverse=True)
-        top = positive_sorted[:limit]
-        low = list(reversed(positive_sorted))[:limit]
+        positive_sorted = sorted(positive, key=lambda kv: (-kv[1]["fees_msat"], -kv[1]["amt_out_msat"], kv[0]))
+        items = [
+            {
+                "alias": display(k),
+                "pub_key": None if k.startswith("chan:") else k,
+                "fees_sat": v["fees_msat"] // 1000,
+                "amount_sat": v["amt_out_msat"] // 1000,
+                "amount_in_sat": v["amt_in_msat"] // 1000,
+                "events": v["events"],
+                "channels": sorted(v["channels"]),
+            }
+            for k, v in positive_sorted
+        ]
+        top = items[:limit]
+        low = list(reversed(items))[:limit]
+
+        channels_sorted = sorted(
+            (c for c in channels if c[1]["fees_msat"] > 0),
+            key=lambda c: (-c[1]["fees_msat"], c[0]),
+        )
+        top_channels = [
+            {
+                "chan_id": chan_id,
+                "pub_key": chan_peer.get(chan_id),
+                "alias": display(peer_key(chan_id)),
+                "fees_sat": v["fees_msat"] // 1000,
+                "amount_sat": v["amt_out_msat"] // 1000,
+                "events": v["events"],
+            }
+            for chan_id, v in channels_sorted[:limit]
+        ]
 
         return {
             "window_days": days,
@@ -446,13 +542,317 @@ def get_top_forwarding_peers(days=30, limit=5):
             "total_events": total_events,
             "top": top,
             "low": low,
+            "top_channels": top_channels,
         }
     except Exception as e:
         return {"error": str(e)}
 
+# -----------------------------
+# Analytics de encaminhamento (NumPy)
+# -----------------------------
+@flights["fwd_analytics"].wrap
+def get_forwarding_analytics(days=30, top=20):
+    """
+    Distribuição de ppm efetivo, histograma de valores, percentis por peer e
+    fluxos entrada->saída na janela de `days` dias (ver fwd_analytics.py).
+    Retorna dict; em caso de falha, {"error": "..."}.
+    """
+    try:
+        lncli_cmd = _lncli_base_cmd()
+        now_ts = int(datetime.utcnow().timestamp())
+        start_ts = now_ts - days * 86400
+
+        t0 = time.perf_counter()
+        cols = forwarding_store.window(
+            start_ts, now_ts,
+            lambda anchor, end_ts, offset: _iter_forwarding_pages(lncli_cmd, anchor, end_ts, offset),
+        )
+        peer_of_chan = alias_cache.resolve(lncli_cmd, fwd_analytics.channel_ids(cols))
+        result = fwd_analytics.analyze(cols, peer_of_chan, alias_cache.alias, top=top)
+        result.update({
+            "window_days": days,
+            "generated_at": datetime.utcnow().isoformat() + "Z",
+            "compute_ms": round((time.perf_counter() - t0) * 1000, 1),
+        })
+        return result
+    except ImportError:
+        return {"error": "numpy não instalado (pip3 install numpy)"}
+    except Exception as e:
+        return {"error": str(e)}
+
+# -----------------------------
+# Frota (vários nós)
+# -----------------------------
+@flights["fleet"].wrap
+def get_fleet_status():
+    """Coleta todos os nós da frota em paralelo (asyncio, timeout por nó)."""
+    return fleet.collect_fleet(FLEET_NODES)
+
+# -----------------------------
+# Lucro off-chain (lnd_fees.sqlite)
+# -----------------------------
+@flights["lnd_fees"].wrap
+def get_lnd_fees_summary():
+    """
+    Lê a base lnd_fees.sqlite (script do jvx) no formato que o front espera:
+    last_day / monthly / year_to_date.
+    Inclui label/date_br para não rotular errado quando o DB estiver atrasado ou em outro timezone.
+    Lança exceção em caso de erro (a rota converte em 500).
+    """
+    latest = fetch_daily_latest()
+    months = fetch_month_summary()
+    ytd = fetch_ytd()
+
+    # timezone local (ajuste se quiser outro)
+    TZ = ZoneInfo("America/Sao_Paulo")
+    today_local = datetime.now(TZ).date()
+    yesterday_local = today_local - timedelta(days=1)
+
+    last_day = None
+    if latest:
+        db_date_raw = latest[0]
+
+        # Normaliza a data do SQLite para um date()
+        if isinstance(db_date_raw, datetime):
+            db_date = db_date_raw.date()
+        elif isinstance(db_date_raw, date):
+            db_date = db_date_raw
+        else:
+            # normalmente vem 'YYYY-MM-DD'
+            db_date = datetime.strptime(str(db_date_raw), "%Y-%m-%d").date()
+
+        if db_date == today_local:
+            label = "Hoje"
+        elif db_date == yesterday_local:
+            label = "Ontem"
+        else:
+            label = "Último dia no DB"
+
+        last_day = {
+            "date": str(db_date),                 # mantém compatibilidade (YYYY-MM-DD)
+            "date_br": db_date.strftime("%d/%m/%Y"),
+            "label": label,
+            "forwards": latest[1],
+            "rebalances": latest[2],
+            "profit": latest[3],
+        }
+
+    monthly = [
+        {
+            "month": row[0],
+            "forwards": row[1],
+            "rebalances": row[2],
+            "profit": row[3],
+        }
+        for row in (months or [])
+    ]
+
+    year_to_date = ytd[2] if ytd else 0
+
+    return {
+        "last_day": last_day,
+        "monthly": monthly,
+        "year_to_date": year_to_date,
+    }
+
+# -----------------------------
+# Warm-up em background + readiness
+# -----------------------------
+_started_at = time.time()
+_ready = threading.Event()
+_warmup_lock = threading.Lock()
+_warmup_thread = None
+_warmup_info = {"started_at": None, "finished_at": None, "errors": {}}
+
+def _warmup():
+    """
+    Roda cada coletor uma vez: importa os módulos pesados, preenche o cache
+    do cpuinfo, faz o psutil.cpu_percent ter base de comparação e deixa
+    lncli/bitcoin-cli (e o docker exec do Umbrel) quentes no disco.
+    """
+    steps = [
+        ("cpu_usage", get_cpu_usage),
+        ("cpu_info", get_cpu_info),
+        ("memory", get_memory_usage),
+        ("disks", get_physical_disks_usage),
+        ("cpu_temp", get_cpu_temp),
+        ("sensors", get_sensor_temperatures),
+        ("message", read_message_from_file),
+        ("bitcoin", get_bitcoin_info.warm),
+        ("lnd", get_lnd_info.warm),
+        ("fees", get_fee_info.warm),
+    ]
+    _warmup_info["started_at"] = time.time()
+    try:
+        for name, fn in steps:
+            try:
+                result = fn()
+                refresher.observe(name, result)
+                if isinstance(result, dict) and result.get("error"):
+                    _warmup_info["errors"][name] = result["error"]
+            except Exception as e:
+                _warmup_info["errors"][name] = str(e)
+    finally:
+        _warmup_info["finished_at"] = time.time()
+        _ready.set()
+        refresher.start()
+
+def start_warmup():
+    """Dispara o warm-up uma única vez (idempotente)."""
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=_warmup, name="node-status-warmup", daemon=True)
+            _warmup_thread.start()
+
+# -----------------------------
+# Refresh por eventos (bitcoind ZMQ, streams do LND, arquivos)
+# -----------------------------
+refresher = RefreshScheduler(debounce=REFRESH_DEBOUNCE_S)
+
+def _event_ttl(name):
+    """Seção com fonte de eventos: o cache pode durar mais, o evento invalida."""
+    flights[name].ttl = max(flights[name].ttl, REFRESH_EVENT_TTL_S)
+
+def _setup_refresh():
+    # O histórico de liquidez amostra na coleta do LND; a próxima amostra é
+    # agendada a partir da última gravada, não do último refresh do LND
+    # (senão uma coleta extra logo antes do prazo empurra a amostra um ciclo).
+    liquidity_due = liquidity.next_due if liquidity is not None else None
+
+    # forget() mantém o valor antigo servível (stale); o recálculo usa .refresh
+    # para esperar o resultado novo em vez de receber o antigo.
+    refresher.add_section("bitcoin", flights["bitcoin"].forget, get_bitcoin_info.refresh, fallback=REFRESH_FALLBACK_S)
+    refresher.add_section("lnd", flights["lnd"].forget, get_lnd_info.refresh,
+                          fallback=REFRESH_FALLBACK_S, due=liquidity_due)
+    refresher.add_section("lnd_fees", flights["lnd_fees"].forget, get_lnd_fees_summary.refresh)
+    refresher.add_section("message", flights["message"].forget, read_message_from_file.refresh)
+    # Quem recebeu o snapshot do warm-up viu valor antigo: o recálculo em
+    # background atualiza a versão para a página recarregar com o novo
+    for name in ("bitcoin", "lnd"):
+        flights[name].on_revalidate = lambda key, result, name=name: refresher.observe(name, result)
+    # Caras e só usadas sob demanda: eventos apenas invalidam
+    refresher.add_section("top_peers", flights["top_peers"].forget)
+    refresher.add_section("fwd_analytics", flights["fwd_analytics"].forget)
+
+    if REFRESH_FILE_POLL_S > 0:
+        refresher.watch_files({
+            LND_FEES_DB_PATH: ["lnd_fees"],
+            LND_FEES_DB_PATH + "-wal": ["lnd_fees"],
+            MESSAGE_FILE_PATH: ["message"],
+        }, interval=REFRESH_FILE_POLL_S)
+        _event_ttl("lnd_fees")
+        _event_ttl("message")
+
+    if ZMQ_HASHBLOCK:
+        refresher.subscribe_zmq(ZMQ_HASHBLOCK, "hashblock", ["bitcoin", "lnd"])
+        _event_ttl("bitcoin")
+    if ZMQ_RAWTX:
+        # Mempool gera muitos eventos: só invalida o saldo on-chain, com debounce longo
+        refresher.subscribe_zmq(ZMQ_RAWTX, "rawtx", ["lnd"], recompute=False, debounce=RAWTX_DEBOUNCE_S)
+
+    if LND_REST_URL:
+        lnd_stream = lambda path, sections, **kw: refresher.subscribe_lnd_stream(  # noqa: E731
+            LND_REST_URL, path, sections,
+            macaroon_path=LND_MACAROON_PATH, tls_cert_path=LND_TLS_CERT_PATH,
+            read_timeout=LND_STREAM_TIMEOUT_S, **kw)
+        lnd_stream("/v1/channels/subscribe", ["lnd"])
+        lnd_stream("/v1/peers/subscribe", ["lnd"])
+        lnd_stream("/v1/invoices/subscribe", ["lnd"])
+        lnd_stream("/v2/router/htlcevents", ["lnd", "top_peers", "fwd_analytics"],
+                   recompute=False, debounce=RAWTX_DEBOUNCE_S)
+        _event_ttl("lnd")
+
+_setup_refresh()
+
+# -----------------------------
+# Assets (hash no nome + gzip/brotli) e compressão de respostas
+# -----------------------------
+@app.context_processor
+def _asset_helpers():
+    def asset_url(filename):
+        return url_for('asset', filename=asset_manifest.url(filename))
+    return {"asset_url": asset_url}
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    """
+    Arquivos de static/ com hash no nome: cache imutável de 1 ano.
+    Hash antigo redireciona para o atual; sem hash, cache curto.
+    """
+    resolved = asset_manifest.resolve(filename)
+    if resolved is None:
+        return "Not found", 404
+    logical, current_hash, hash_matches = resolved
+    if not hash_matches and filename != logical:
+        return redirect(url_for('asset', filename=asset_manifest.url(logical)))
+
+    body, encoding = asset_manifest.variant(logical, request.headers.get('Accept-Encoding'))
+    etag = f'"{current_hash}-{encoding or "identity"}"'
+    headers = {
+        "Cache-Control": "public, max-age=31536000, immutable" if hash_matches else "public, max-age=300",
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+    }
+    if request.headers.get('If-None-Match') == etag:
+        return Response(status=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    mimetype = mimetypes.guess_type(logical)[0] or 'application/octet-stream'
+    return Response(body, mimetype=mimetype, headers=headers)
+
+@app.after_request
+def _gzip_response(response):
+    """Comprime HTML/JSON dinâmicos quando o cliente aceita gzip."""
+    if (
+        not GZIP_MIN_SIZE
+        or response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in ('text/html', 'application/json')
+        or 'gzip' not in accepted_encodings(request.headers.get('Accept-Encoding'))
+    ):
+        return response
+    data = response.get_data()
+    if len(data) < GZIP_MIN_SIZE:
+        return response
+    response.set_data(gzip_body(data))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
 # -----------------------------
 # Rotas
 # -----------------------------
+@app.before_request
+def _ensure_warmup():
+    # Sob gunicorn/uwsgi o __main__ não roda: a primeira requisição dispara
+    start_warmup()
+
+@app.route('/healthz')
+def healthz():
+    """Processo de pé (liveness). Não toca em LND/bitcoind."""
+    return jsonify({"status": "ok", "uptime_s": round(time.time() - _started_at, 3)})
+
+@app.route('/readyz')
+def readyz():
+    """Primeiro snapshot completo (readiness); 503 enquanto o warm-up roda."""
+    info = {
+        "ready": _ready.is_set(),
+        "uptime_s": round(time.time() - _started_at, 3),
+        "warmup_s": None,
+        "errors": dict(_warmup_info["errors"]),
+    }
+    if _warmup_info["finished_at"] and _warmup_info["started_at"]:
+        info["warmup_s"] = round(_warmup_info["finished_at"] - _warmup_info["started_at"], 3)
+    return jsonify(info), (200 if info["ready"] else 503)
+
+@app.route('/refresh-state')
+def refresh_state():
+    """Versões por seção e contadores do refresh por eventos (não roda coletores)."""
+    return jsonify(refresher.state())
+
 @app.route('/get-log', methods=['GET'])
 def get_log():
     log_path = os.path.expanduser("~/.lnd/logs/bitcoin/mainnet/lnd.log")
@@ -490,6 +890,7 @@ def pay_invoice():
         return jsonify({'error': 'Missing payment request'}), 400
     try:
         _ = run_command(['lncli', 'payinvoice', '--force', pay_req], timeout=10)
+        refresher.notify(["lnd"], "pay-invoice")
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'error': str(e), 'success': False}), 500
@@ -528,6 +929,9 @@ def check_payment():
 
 @app.route('/status')
 def status():
+    # Versões antes de coletar: se algo for recalculado depois, a página recarrega
+    sections = refresher.state()["sections"]
+    refresh_versions = ",".join(str(sections[name]["version"]) for name in ("bitcoin", "lnd", "message"))
     system_info = {
         "cpu_usage":             get_cpu_usage(),
         "memory_usage":          get_memory_usage(),
@@ -551,6 +955,7 @@ def status():
         node_alias=node_alias,
         message=message,
         fee_info=fee_info,
+        refresh_versions=refresh_versions,
     )
 
 @app.route("/lnd-fees")
@@ -558,64 +963,9 @@ def api_lnd_fees():
     """
     Exposição HTTP da base lnd_fees.sqlite (script do jvx).
     Mantém o formato que o front espera: last_day / monthly / year_to_date.
-    Agora também inclui label/date_br para não rotular errado quando o DB estiver atrasado ou em outro timezone.
     """
     try:
-        latest = fetch_daily_latest()
-        months = fetch_month_summary()
-        ytd = fetch_ytd()
-
-        # timezone local (ajuste se quiser outro)
-        TZ = ZoneInfo("America/Sao_Paulo")
-        today_local = datetime.now(TZ).date()
-        yesterday_local = today_local - timedelta(days=1)
-
-        last_day = None
-        if latest:
-            db_date_raw = latest[0]
-
-            # Normaliza a data do SQLite para um date()
-            if isinstance(db_date_raw, datetime):
-                db_date = db_date_raw.date()
-            elif isinstance(db_date_raw, date):
-                db_date = db_date_raw
-            else:
-                # normalmente vem 'YYYY-MM-DD'
-                db_date = datetime.strptime(str(db_date_raw), "%Y-%m-%d").date()
-
-            if db_date == today_local:
-                label = "Hoje"
-            elif db_date == yesterday_local:
-                label = "Ontem"
-            else:
-                label = "Último dia no DB"
-
-            last_day = {
-                "date": str(db_date),                 # mantém compatibilidade (YYYY-MM-DD)
-                "date_br": db_date.strftime("%d/%m/%Y"),
-                "label": label,
-                "forwards": latest[1],
-                "rebalances": latest[2],
-                "profit": latest[3],
-            }
-
-        monthly = [
-            {
-                "month": row[0],
-                "forwards": row[1],
-                "rebalances": row[2],
-                "profit": row[3],
-            }
-            for row in (months or [])
-        ]
-
-        year_to_date = ytd[2] if ytd else 0
-
-        return jsonify({
-            "last_day": last_day,
-            "monthly": monthly,
-            "year_to_date": year_to_date,
-        })
+        return jsonify(get_lnd_fees_summary())
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -639,10 +989,118 @@ def api_top_peers():
         return jsonify(data), 500
     return jsonify(data)
 
+@app.route("/fwd-analytics")
+def api_fwd_analytics():
+    """
+    Analytics de encaminhamento para ajuste de fees.
+    Parâmetros opcionais: ?days=1..365 (default 30) e ?top=1..100 (default 20).
+    """
+    try:
+        days = int(request.args.get("days", 30))
+    except (TypeError, ValueError):
+        days = 30
+    if days <= 0 or days > 365:
+        days = 30
+
+    try:
+        top = int(request.args.get("top", 20))
+    except (TypeError, ValueError):
+        top = 20
+    top = min(max(top, 1), 100)
+
+    data = get_forwarding_analytics(days=days, top=top)
+    if isinstance(data, dict) and data.get("error"):
+        return jsonify(data), 500
+    return jsonify(data)
+
+@app.route("/liquidity/channel/<chan_id>")
+def api_liquidity_curve(chan_id):
+    """
+    Curva de saldo (local/remote) de um canal, ponto a cada mudança.
+    Parâmetro opcional: ?hours=N (default: todo o histórico).
+    """
+    if liquidity is None:
+        return jsonify({"error": "liquidity history disabled"}), 404
+    if not chan_id.isdigit():
+        return jsonify({"error": "chan_id inválido"}), 400
+    since = None
+    try:
+        hours = float(request.args.get("hours", 0))
+    except (TypeError, ValueError):
+        hours = 0
+    if hours > 0:
+        since = int(time.time() - hours * 3600)
+    return jsonify({"chan_id": chan_id, "points": liquidity.curve(chan_id, since=since)})
+
+@app.route("/liquidity/depleted")
+def api_liquidity_depleted():
+    """
+    Canais esgotados há pelo menos ?hours=N (default 24).
+    Opcionais: ?threshold=0..1 (fração da capacidade, default 0.05)
+    e ?side=local|remote (default local = sem liquidez de saída).
+    """
+    if liquidity is None:
+        return jsonify({"error": "liquidity history disabled"}), 404
+    try:
+        hours = float(request.args.get("hours", 24))
+    except (TypeError, ValueError):
+        hours = 24
+    try:
+        threshold = float(request.args.get("threshold", 0.05))
+    except (TypeError, ValueError):
+        threshold = 0.05
+    threshold = min(max(threshold, 0.0), 1.0)
+    side = request.args.get("side", "local")
+    if side not in ("local", "remote"):
+        side = "local"
+
+    channels = liquidity.depleted(hours, threshold=threshold, side=side)
+    for ch in channels:
+        ch["alias"] = alias_cache.alias(ch["pub_key"])
+    return jsonify({
+        "hours": hours,
+        "threshold": threshold,
+        "side": side,
+        "channels": channels,
+        "history": liquidity.stats(),
+    })
+
+@app.route("/fleet")
+def fleet_overview():
+    """Visão agregada da frota, com link para o status de cada nó."""
+    if not FLEET_NODES:
+        return "Fleet mode disabled: add [node:<name>] sections to node-status.config", 404
+    return render_template('fleet.html', fleet=get_fleet_status())
+
+@app.route("/fleet.json")
+def api_fleet():
+    if not FLEET_NODES:
+        return jsonify({"error": "fleet mode disabled"}), 404
+    return jsonify(get_fleet_status())
+
+@app.route("/fleet/<name>")
+def fleet_node_status(name):
+    """Drill-down: o status.html de sempre, com os dados do nó escolhido."""
+    data = get_fleet_status()
+    node = next((n for n in data["nodes"] if n["name"] == name), None)
+    if node is None:
+        return f"Unknown node: {name}", 404
+    return render_template(
+        'status.html',
+        system_info=None,
+        bitcoind=node["bitcoin"],
+        lnd=node["lnd"],
+        node_alias=node["lnd"].get("node_alias") or node["label"],
+        message=read_message_from_file(),
+        fee_info=get_fee_info(),
+        fleet_node=node,
+    )
+
 # -----------------------------
 # Entrypoint (HTTPS self-signed)
 # -----------------------------
 if __name__ == '__main__':
+    start_warmup()
     # Necessário para usar câmera no browser (QR) com HTTPS
     # Os arquivos cert-ns.pem e key-ns.pem devem existir na pasta do projeto
     app.run(host='0.0.0.0', port=5000, ssl_context=('cert-ns.pem', 'key-ns.pem'))
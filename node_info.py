@@ -0,0 +1,104 @@
+"""
+Comandos e formato dos dados de bitcoind/LND de um nó.
+
+Compartilhado entre o dashboard de um nó (node-status.py) e o modo frota
+(fleet.py): os dois montam os mesmos comandos e entregam os mesmos dicts
+para o status.html.
+"""
+
+
+def lncli_base_cmd(environment, umbrel_path, extra_args=()):
+    """Comando base do lncli conforme o ambiente (minibolt ou umbrel)."""
+    if environment == 'minibolt':
+        return ['lncli'] + list(extra_args)
+    return [f"{umbrel_path}app", "compose", "lightning", "exec", "lnd", "lncli"] + list(extra_args)
+
+
+def bitcoin_cli_base_cmd(environment, running_bitcoin, umbrel_path,
+                         rpc_user=None, rpc_pass=None, rpc_host=None, rpc_port=None):
+    """
+    Comando base do bitcoin-cli e o rótulo exibido no título do card.
+    Retorna (cmd, label).
+    """
+    if environment == 'minibolt' and running_bitcoin == 'external':
+        return [
+            'bitcoin-cli',
+            f'-rpcuser={rpc_user}',
+            f'-rpcpassword={rpc_pass}',
+            f'-rpcconnect={rpc_host}',
+            f'-rpcport={rpc_port}'
+        ], rpc_host
+    if environment == 'minibolt':
+        return ['bitcoin-cli'], 'LOCAL - Minibolt'
+    return [f"{umbrel_path}app", "compose", "bitcoin", "exec", "bitcoind", "bitcoin-cli"], 'LOCAL - Umbrel'
+
+
+# Subcomandos lidos em cada coleta (na ordem dos argumentos de build_*)
+BITCOIN_COMMANDS = ['getblockchaininfo', 'getpeerinfo', 'getnetworkinfo']
+LND_COMMANDS = ['walletbalance', 'channelbalance', 'listchannels', 'listpeers', 'getinfo']
+
+
+def build_bitcoin_info(blockchain_data, peers_data, network_data, label):
+    return {
+        "sync_percentage": blockchain_data.get("verificationprogress", 0) * 100,
+        "current_block_height": blockchain_data.get("blocks", 0),
+        "chain": blockchain_data.get("chain", "unknown"),
+        "pruned": blockchain_data.get("pruned", False),
+        "number_of_peers": len(peers_data),
+        "bitcoind": label,
+        "version": network_data.get("version", "unknown"),
+        "subversion": network_data.get("subversion", "unknown"),
+        "error": None
+    }
+
+
+def bitcoin_info_error(e):
+    return {
+        "sync_percentage": None,
+        "current_block_height": None,
+        "chain": None,
+        "pruned": None,
+        "number_of_peers": None,
+        "bitcoind": f"error: {e}",
+        "version": None,
+        "subversion": None,
+        "error": str(e)
+    }
+
+
+def build_lnd_info(wallet_balance_data, channel_balance_data, channels_data, peers_data, node_data):
+    return {
+        "wallet_balance": int(wallet_balance_data.get("total_balance", 0)),
+        "channel_balance": int(channel_balance_data.get("balance", 0)),
+        "total_balance": int(wallet_balance_data.get("total_balance", 0)) + int(channel_balance_data.get("balance", 0)),
+        "number_of_channels": len(channels_data.get("channels", [])),
+        "number_of_peers": len(peers_data.get("peers", [])),
+        "node_alias": node_data.get("alias", "N/A"),
+        "node_lnd_version": node_data.get("version"),
+        "pub_key": node_data.get("identity_pubkey"),
+        "num_pending_channels": node_data.get("num_pending_channels"),
+        "num_active_channels": node_data.get("num_active_channels"),
+        "num_inactive_channels": node_data.get("num_inactive_channels"),
+        "synced_to_chain": node_data.get("synced_to_chain"),
+        "synced_to_graph": node_data.get("synced_to_graph"),
+        "error": None
+    }
+
+
+def lnd_info_error(e):
+    return {
+        "wallet_balance": None,
+        "channel_balance": None,
+        "total_balance": None,
+        "number_of_channels": None,
+        "number_of_peers": None,
+        "node_alias": "N/A",
+        "node_lnd_version": None,
+        "pub_key": None,
+        "num_pending_channels": None,
+        "num_active_channels": None,
+        "num_inactive_channels": None,
+        "synced_to_chain": None,
+        "synced_to_graph": None,
+        "error": str(e)
+    }
@@ -0,0 +1,393 @@
+"""
+Refresh dos coletores guiado por eventos, em vez de só por visita à página.
+
+Cada seção (bitcoin, lnd, lnd_fees, message, ...) registra como invalidar o
+cache (flights[...].forget) e, opcionalmente, como recalcular. Fontes de
+eventos chamam notify() com as seções afetadas:
+
+  - ZMQ do bitcoind (hashblock, rawtx)          -> pyzmq opcional
+  - streams REST do LND (canais, peers, ...)    -> requests
+  - mtime/tamanho de arquivos (lnd_fees.sqlite, mensagem)
+
+Rajadas de eventos são agrupadas (debounce, com atraso máximo) e cada seção
+é recalculada uma vez por rajada. Seções com `fallback` > 0 também são
+recalculadas quando ficam esse tempo sem nenhum refresh (poll de segurança
+para quando as fontes de eventos estão fora do ar ou não configuradas).
+Seções com `due` são recalculadas no instante que ele indicar (agenda que não
+depende do último refresh, ex.: próxima amostra do histórico de liquidez).
+
+notify(..., recompute=False) só invalida: o próximo acesso recalcula. É o
+modo para eventos frequentes (rawtx, HTLCs) que não justificam trabalho
+imediato.
+"""
+import json
+import os
+import threading
+import time
+
+# Um mesmo `due` que já disparou (recálculo falhou ou não moveu a agenda)
+# só dispara de novo depois deste intervalo.
+_DUE_RETRY_S = 60.0
+
+
+class _Section:
+    __slots__ = ("name", "invalidate", "recompute", "fallback", "due", "due_fired",
+                 "last_refresh", "fingerprint", "version", "refreshes", "last_reasons", "error")
+
+    def __init__(self, name, invalidate, recompute, fallback, due):
+        self.name = name
+        self.invalidate = invalidate
+        self.recompute = recompute
+        self.fallback = fallback
+        self.due = due
+        self.due_fired = None   # (valor de due, monotonic do disparo)
+        self.last_refresh = time.monotonic()
+        self.fingerprint = None
+        self.version = 0
+        self.refreshes = 0
+        self.last_reasons = []
+        self.error = None
+
+
+def _keepalive_session(requests):
+    """
+    Session com TCP keepalive: se o host do LND some sem fechar a conexão,
+    o kernel derruba o socket em ~2 min em vez de o read bloquear para sempre.
+    """
+    import socket
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection
+
+    options = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    for name, value in (("TCP_KEEPIDLE", 60), ("TCP_KEEPINTVL", 15), ("TCP_KEEPCNT", 4)):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+
+    class KeepaliveAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            kwargs["socket_options"] = options
+            super().init_poolmanager(*args, **kwargs)
+
+    session = requests.Session()
+    session.mount("http://", KeepaliveAdapter())
+    session.mount("https://", KeepaliveAdapter())
+    return session
+
+
+def _is_read_timeout(requests, exc):
+    # Durante iter_lines o requests embrulha o ReadTimeoutError do urllib3 em ConnectionError
+    from urllib3.exceptions import ReadTimeoutError
+    return isinstance(exc, requests.exceptions.ReadTimeout) or any(
+        isinstance(arg, ReadTimeoutError) for arg in getattr(exc, "args", ()))
+
+
+def _file_stat(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+class RefreshScheduler:
+    """
+    Agenda invalidações/recálculos por seção a partir de eventos.
+
+    - `debounce`: espera após o último evento de uma rajada antes de rodar.
+    - `max_delay`: limite para uma rajada contínua não adiar para sempre.
+    """
+
+    def __init__(self, debounce=2.0, max_delay=15.0):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._sections = {}
+        self._pending = {}    # seção -> {"due", "first", "recompute", "reasons"}
+        self._sources = []    # (nome, função do loop)
+        self._stop = threading.Event()
+        self._worker = None
+        self.sources = {}     # nome -> {"events": n, "status": str, "error": str|None}
+        self.stats = {"notifications": 0, "coalesced": 0, "refreshes": 0,
+                      "recomputes": 0, "fallbacks": 0, "scheduled": 0}
+
+    # -----------------------------
+    # Seções e notificações
+    # -----------------------------
+    def add_section(self, name, invalidate, recompute=None, fallback=0.0, due=None):
+        """
+        `due`: função sem argumentos que retorna o instante (epoch) do próximo
+        recálculo obrigatório, ou None.
+        """
+        self._sections[name] = _Section(name, invalidate, recompute, fallback, due)
+
+    def notify(self, sections, reason="", recompute=True, debounce=None):
+        """Marca seções como sujas; o worker roda após o debounce."""
+        delay = self.debounce if debounce is None else debounce
+        now = time.monotonic()
+        with self._cond:
+            for name in sections:
+                if name not in self._sections:
+                    continue
+                self.stats["notifications"] += 1
+                p = self._pending.get(name)
+                if p is None:
+                    self._pending[name] = {"due": now + delay, "first": now,
+                                           "recompute": recompute, "reasons": {reason}}
+                    continue
+                self.stats["coalesced"] += 1
+                p["reasons"].add(reason)
+                if p["recompute"] and not recompute:
+                    # o recálculo já agendado cobre a invalidação; não adia
+                    continue
+                if recompute and not p["recompute"]:
+                    # evento que pede recálculo não espera a rajada de invalidações
+                    p.update(due=now + delay, first=now, recompute=True)
+                    continue
+                limit = p["first"] + max(self.max_delay, delay)
+                p["due"] = min(max(p["due"], now + delay), limit)
+            self._cond.notify()
+
+    def _queue_fallbacks(self, now):
+        for s in self._sections.values():
+            if s.fallback > 0 and s.name not in self._pending and now - s.last_refresh >= s.fallback:
+                self._pending[s.name] = {"due": now, "first": now,
+                                         "recompute": True, "reasons": {"fallback"}}
+                self.stats["fallbacks"] += 1
+        for s in self._sections.values():
+            if s.name in self._pending:
+                continue
+            at, deadline = self._due_deadline(s, now)
+            if deadline is not None and deadline <= now:
+                self._pending[s.name] = {"due": now, "first": now,
+                                         "recompute": True, "reasons": {"scheduled"}}
+                s.due_fired = (at, now)
+                self.stats["scheduled"] += 1
+
+    def _due_deadline(self, section, now):
+        """(valor de due, prazo em monotonic) da seção, ou (None, None)."""
+        if section.due is None:
+            return None, None
+        try:
+            at = section.due()
+        except Exception:
+            return None, None
+        if at is None:
+            return None, None
+        deadline = now + (at - time.time())
+        if section.due_fired is not None and section.due_fired[0] == at:
+            deadline = max(deadline, section.due_fired[1] + _DUE_RETRY_S)
+        return at, deadline
+
+    def _next_wakeup(self, now):
+        deadlines = [p["due"] for p in self._pending.values()]
+        deadlines += [s.last_refresh + s.fallback for s in self._sections.values()
+                      if s.fallback > 0 and s.name not in self._pending]
+        deadlines += [self._due_deadline(s, now)[1] for s in self._sections.values()
+                      if s.due is not None and s.name not in self._pending]
+        deadlines = [d for d in deadlines if d is not None]
+        return max(min(deadlines, default=now + 60), now + 0.05)
+
+    def _observe(self, section, result):
+        # Versão só muda quando o conteúdo muda (a página usa isso para recarregar)
+        fingerprint = hash(json.dumps(result, sort_keys=True, default=str))
+        with self._cond:
+            if fingerprint != section.fingerprint:
+                section.fingerprint = fingerprint
+                section.version += 1
+
+    def observe(self, name, result):
+        """
+        Resultado de uma seção calculado fora do worker (ex.: recálculo em
+        background do cache); atualiza a versão se o conteúdo mudou.
+        """
+        section = self._sections.get(name)
+        if section is not None:
+            self._observe(section, result)
+
+    def _refresh(self, section, pending):
+        try:
+            section.invalidate()
+            if pending["recompute"] and section.recompute is not None:
+                result = section.recompute()
+                self.stats["recomputes"] += 1
+                self._observe(section, result)
+                section.last_refresh = time.monotonic()
+            elif section.recompute is None:
+                section.last_refresh = time.monotonic()
+            section.error = None
+        except Exception as e:
+            section.error = str(e)
+        section.refreshes += 1
+        section.last_reasons = sorted(pending["reasons"])
+        self.stats["refreshes"] += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._cond:
+                now = time.monotonic()
+                self._queue_fallbacks(now)
+                due = [name for name, p in self._pending.items() if p["due"] <= now]
+                if not due:
+                    self._cond.wait(self._next_wakeup(now) - now)
+                    continue
+                batch = [(self._sections[name], self._pending.pop(name)) for name in due]
+            for section, pending in batch:
+                self._refresh(section, pending)
+
+    # -----------------------------
+    # Ciclo de vida
+    # -----------------------------
+    def start(self):
+        """Inicia o worker e as fontes registradas (idempotente)."""
+        with self._cond:
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run, name="refresh-worker", daemon=True)
+        self._worker.start()
+        for name, loop in self._sources:
+            threading.Thread(target=loop, name=f"refresh-{name}", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
+
+    def state(self):
+        now = time.monotonic()
+        with self._cond:
+            pending = set(self._pending)
+        return {
+            "stats": dict(self.stats),
+            "sources": {k: dict(v) for k, v in self.sources.items()},
+            "sections": {
+                s.name: {
+                    "version": s.version,
+                    "refreshes": s.refreshes,
+                    "last_refresh_s_ago": round(now - s.last_refresh, 1),
+                    "last_reasons": s.last_reasons,
+                    "pending": s.name in pending,
+                    "error": s.error,
+                }
+                for s in self._sections.values()
+            },
+        }
+
+    # -----------------------------
+    # Fontes de eventos
+    # -----------------------------
+    def _add_source(self, name, loop):
+        self.sources[name] = {"events": 0, "status": "starting", "error": None}
+        self._sources.append((name, loop))
+
+    def _source_event(self, name):
+        self.sources[name]["events"] += 1
+
+    def _source_status(self, name, status, error=None):
+        self.sources[name].update(status=status, error=error)
+
+    def watch_files(self, paths, interval=2.0):
+        """
+        paths: {caminho: [seções]}. Polling de (mtime, tamanho) a cada
+        `interval` s; só stat(), sem dependência de inotify.
+        """
+        name = "files"
+
+        def loop():
+            last = {path: _file_stat(path) for path in paths}
+            self._source_status(name, "watching")
+            while not self._stop.wait(interval):
+                for path, sections in paths.items():
+                    current = _file_stat(path)
+                    if current != last[path]:
+                        last[path] = current
+                        self._source_event(name)
+                        self.notify(sections, f"file:{os.path.basename(path)}")
+
+        self._add_source(name, loop)
+
+    def subscribe_zmq(self, endpoint, topic, sections, recompute=True, debounce=None):
+        """Notificações ZMQ do bitcoind (zmqpubhashblock/zmqpubrawtx)."""
+        name = f"zmq:{topic}"
+
+        def loop():
+            try:
+                import zmq
+            except ImportError:
+                self._source_status(name, "disabled", "pyzmq não instalado (pip3 install pyzmq)")
+                return
+            sock = zmq.Context.instance().socket(zmq.SUB)
+            try:
+                sock.setsockopt(zmq.SUBSCRIBE, topic.encode())
+                sock.connect(endpoint)   # o zmq reconecta sozinho se o bitcoind reiniciar
+                self._source_status(name, "subscribed")
+                while not self._stop.is_set():
+                    if not sock.poll(1000):
+                        continue
+                    sock.recv_multipart()
+                    self._source_event(name)
+                    self.notify(sections, name, recompute=recompute, debounce=debounce)
+            except Exception as e:
+                self._source_status(name, "error", str(e))
+            finally:
+                sock.close(0)
+
+        self._add_source(name, loop)
+
+    def subscribe_lnd_stream(self, base_url, path, sections, macaroon_path=None,
+                             tls_cert_path=None, recompute=True, debounce=None,
+                             read_timeout=None):
+        """
+        Stream REST do LND (JSON por linha, ex.: /v1/channels/subscribe).
+        Reconecta com backoff; ao voltar de uma queda, notifica uma vez (com
+        o mesmo recompute/debounce da fonte), já que eventos podem ter sido
+        perdidos enquanto estava fora.
+
+        Os streams ficam mudos enquanto o nó está quieto, então silêncio não
+        é queda: conexão meio-aberta é detectada pelo TCP keepalive do
+        socket. `read_timeout` (desligado por padrão) só força reconectar um
+        stream mudo; a fonte fica "stale" e a reconexão não notifica.
+        """
+        name = f"lnd:{path}"
+        url = base_url.rstrip('/') + path
+
+        def loop():
+            import requests
+            session = _keepalive_session(requests)
+            backoff = 1
+            lost = False
+            while not self._stop.is_set():
+                try:
+                    headers = {}
+                    if macaroon_path:
+                        with open(macaroon_path, 'rb') as f:
+                            headers["Grpc-Metadata-macaroon"] = f.read().hex()
+                    verify = tls_cert_path if tls_cert_path else True
+                    with session.get(url, headers=headers, stream=True,
+                                     timeout=(5, read_timeout or None), verify=verify) as r:
+                        r.raise_for_status()
+                        self._source_status(name, "connected")
+                        backoff = 1
+                        if lost:
+                            lost = False
+                            self.notify(sections, f"{name}:reconnect", recompute=recompute, debounce=debounce)
+                        for line in r.iter_lines():
+                            if self._stop.is_set():
+                                return
+                            if not line:
+                                continue
+                            self._source_event(name)
+                            self.notify(sections, name, recompute=recompute, debounce=debounce)
+                    self._source_status(name, "closed")
+                    lost = True
+                except Exception as e:
+                    if _is_read_timeout(requests, e):
+                        self._source_status(name, "stale", f"sem dados há {read_timeout:g}s; reconectando")
+                        backoff = 1
+                    else:
+                        self._source_status(name, "error", str(e))
+                        lost = True
+                if self._stop.wait(backoff):
+                    return
+                backoff = min(backoff * 2, 60)
+
+        self._add_source(name, loop)
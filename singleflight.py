@@ -0,0 +1,174 @@
+import functools
+import threading
+import time
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalescência de chamadas caras (lncli, bitcoin-cli, SQLite).
+
+    - Requisições concorrentes com a mesma chave compartilham uma única
+      execução em andamento e o mesmo resultado (ou a mesma exceção).
+    - O resultado fica em cache por `ttl` segundos para absorver rajadas
+      (ex.: várias abas clicando em "↻" ao mesmo tempo).
+    - `max_concurrency` limita quantas chaves diferentes executam ao mesmo
+      tempo (0 = sem limite).
+    - `cacheable(result)` decide se o resultado entra no cache; erros
+      devolvidos como {"error": ...} não devem ficar presos por `ttl`.
+    - `stale` (stale-while-revalidate, só para o warm-up): o resultado
+      gravado por warm() continua servível por até `stale` segundos depois
+      de vencido (ou invalidado); quem o recebe dispara o recálculo em
+      background. Assim o snapshot do warm-up atende o primeiro /status em
+      vez de um coletor frio. Resultados calculados normalmente não têm
+      essa folga: o primeiro recálculo substitui o snapshot e dali em
+      diante vale só o `ttl`.
+    - `on_revalidate(key, result)`: chamado quando um recálculo em
+      background termina (ex.: avisar o refresh por eventos que há conteúdo
+      novo, já que a página viu o valor antigo).
+    """
+
+    def __init__(self, ttl=0.0, max_concurrency=0, cacheable=None, stale=0.0):
+        self.ttl = ttl
+        self.stale = stale
+        self.cacheable = cacheable or (lambda result: True)
+        self._sem = threading.BoundedSemaphore(max_concurrency) if max_concurrency > 0 else None
+        self._lock = threading.Lock()
+        self._inflight = {}   # key -> _Call
+        self._cache = {}      # key -> [fresco_até, servível_até, resultado]
+        self.on_revalidate = None
+        self.stats = {"computed": 0, "shared": 0, "cached": 0, "stale": 0}
+
+    def _join_or_lead(self, key):
+        """(call, leader); chamar com self._lock."""
+        call = self._inflight.get(key)
+        if call is not None:
+            self.stats["shared"] += 1
+            return call, False
+        call = _Call()
+        self._inflight[key] = call
+        self.stats["computed"] += 1
+        return call, True
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            now = time.monotonic()
+            hit = self._cache.get(key)
+            if hit is not None:
+                if hit[0] > now:
+                    self.stats["cached"] += 1
+                    return hit[2]
+                if hit[1] > now:
+                    # Vencido mas servível: responde já e recalcula em background
+                    self.stats["stale"] += 1
+                    if key not in self._inflight:
+                        call, _ = self._join_or_lead(key)
+                        threading.Thread(target=self._revalidate, args=(key, call, fn, args, kwargs),
+                                         name="singleflight-revalidate", daemon=True).start()
+                    return hit[2]
+                del self._cache[key]
+            call, leader = self._join_or_lead(key)
+        return self._finish(key, call, leader, fn, args, kwargs)
+
+    def refresh(self, key, fn, *args, **kwargs):
+        """Ignora o cache e espera um resultado novo (junta-se a um recálculo em andamento)."""
+        with self._lock:
+            call, leader = self._join_or_lead(key)
+        return self._finish(key, call, leader, fn, args, kwargs)
+
+    def warm(self, key, fn, *args, **kwargs):
+        """Como refresh(), mas o resultado fica servível por mais `stale` segundos."""
+        with self._lock:
+            call, leader = self._join_or_lead(key)
+        return self._finish(key, call, leader, fn, args, kwargs, warm=True)
+
+    def _finish(self, key, call, leader, fn, args, kwargs, warm=False):
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        return self._run_leader(key, call, fn, args, kwargs, warm)
+
+    def _revalidate(self, key, call, fn, args, kwargs):
+        try:
+            result = self._run_leader(key, call, fn, args, kwargs)
+        except Exception:
+            # Falha no recálculo em background: segue servindo o valor antigo
+            return
+        if self.on_revalidate is not None:
+            try:
+                self.on_revalidate(key, result)
+            except Exception:
+                pass
+
+    def _run_leader(self, key, call, fn, args, kwargs, warm=False):
+        try:
+            if self._sem is not None:
+                with self._sem:
+                    call.result = fn(*args, **kwargs)
+            else:
+                call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                stale = self.stale if warm else 0.0
+                if call.error is None and (self.ttl > 0 or stale > 0) and self.cacheable(call.result):
+                    now = time.monotonic()
+                    # descarta vencidos para o cache não crescer sem limite
+                    for k in [k for k, entry in self._cache.items() if entry[1] <= now]:
+                        del self._cache[k]
+                    self._cache[key] = [now + self.ttl, now + self.ttl + stale, call.result]
+                elif call.error is None:
+                    # Resultado novo (ex.: {"error": ...}) substitui o snapshot antigo
+                    self._cache.pop(key, None)
+            call.event.set()
+
+    def forget(self, key=None, keep_stale=True):
+        """
+        Invalida uma chave (ou todo o cache, se key=None). O snapshot do
+        warm-up continua servível dentro da janela `stale` (keep_stale=False
+        descarta de vez); os demais resultados são descartados.
+        """
+        with self._lock:
+            keys = list(self._cache) if key is None else [key]
+            for k in keys:
+                entry = self._cache.get(k)
+                if entry is None:
+                    continue
+                if keep_stale and entry[1] > entry[0]:
+                    entry[0] = 0.0
+                else:
+                    del self._cache[k]
+
+    def wrap(self, fn):
+        """Decorator: a chave é (args, kwargs) da chamada."""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            return self.do(key, fn, *args, **kwargs)
+
+        def refresh(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            return self.refresh(key, fn, *args, **kwargs)
+
+        def warm(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            return self.warm(key, fn, *args, **kwargs)
+
+        wrapper.flight = self
+        wrapper.refresh = refresh
+        wrapper.warm = warm
+        return wrapper
@@ -0,0 +1,293 @@
+"""
+Testes do RefreshScheduler (refresh.py) com as fontes de eventos falsas de
+bench/fake_events.py: ZMQ PUB, streams REST do LND e touch de arquivos.
+
+As asserções olham refresher.state(), o mesmo que /refresh-state expõe.
+"""
+import socket
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+sys.path.insert(0, str(REPO_DIR / "bench"))
+
+from fake_events import FakeLndRest, FakeZmqPublisher, touch  # noqa: E402
+from refresh import RefreshScheduler  # noqa: E402
+
+
+def _free_tcp_endpoint():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"tcp://127.0.0.1:{s.getsockname()[1]}"
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def _section(refresher, name):
+    return refresher.state()["sections"][name]
+
+
+class Counter:
+    """Recompute falso: conta chamadas e devolve `value` (conteúdo da seção)."""
+
+    def __init__(self, value=None):
+        self.calls = []
+        self.value = value
+
+    def __call__(self):
+        self.calls.append(time.monotonic())
+        return self.value
+
+
+@pytest.fixture
+def refresher():
+    schedulers = []
+
+    def make(**kw):
+        r = RefreshScheduler(**kw)
+        schedulers.append(r)
+        return r
+
+    yield make
+    for r in schedulers:
+        r.stop()
+
+
+@pytest.fixture
+def lnd_rest():
+    pytest.importorskip("requests")
+    rest = FakeLndRest()
+    yield rest
+    rest.close()
+
+
+def test_zmq_burst_is_debounced_into_one_refresh(refresher):
+    pytest.importorskip("zmq")
+    endpoint = _free_tcp_endpoint()
+    pub = FakeZmqPublisher(endpoint, "hashblock")
+    try:
+        # Debounce longo perto do intervalo entre eventos: a rajada cabe
+        # numa janela mesmo com a máquina carregada
+        r = refresher(debounce=2.0, max_delay=30.0)
+        recompute = Counter({"blocks": 1})
+        r.add_section("bitcoin", lambda: None, recompute)
+        r.subscribe_zmq(endpoint, "hashblock", ["bitcoin"])
+        r.start()
+        events = lambda: r.state()["sources"]["zmq:hashblock"]["events"]  # noqa: E731
+        # SUB do zmq só recebe depois de conectar: publica até o primeiro chegar
+        assert _wait(lambda: (pub.publish(), events())[1] > 0)
+        assert _wait(lambda: _section(r, "bitcoin")["refreshes"] == 1, timeout=10.0)
+        before = r.state()
+
+        for _ in range(10):
+            pub.publish()
+        assert _wait(lambda: events() == before["sources"]["zmq:hashblock"]["events"] + 10)
+        assert _wait(lambda: _section(r, "bitcoin")["refreshes"] == 2, timeout=10.0)
+
+        state = r.state()
+        assert len(recompute.calls) == 2
+        assert state["stats"]["notifications"] - before["stats"]["notifications"] == 10
+        assert state["stats"]["coalesced"] - before["stats"]["coalesced"] == 9
+        assert state["sections"]["bitcoin"]["last_reasons"] == ["zmq:hashblock"]
+        assert state["sources"]["zmq:hashblock"]["status"] == "subscribed"
+    finally:
+        pub.close()
+
+
+def test_continuous_burst_is_capped_by_max_delay(refresher, lnd_rest):
+    # Eventos a cada 0.05s com debounce de 5s: sem o teto de max_delay a
+    # seção só rodaria depois que a rajada acabasse
+    r = refresher(debounce=5.0, max_delay=0.5)
+    name = "lnd:/v1/channels/subscribe"
+    events_at_recompute = []
+    r.add_section("lnd", lambda: None,
+                  lambda: events_at_recompute.append(r.state()["sources"][name]["events"]) or {"channels": 1})
+    r.subscribe_lnd_stream(lnd_rest.url, "/v1/channels/subscribe", ["lnd"])
+    r.start()
+    assert _wait(lambda: lnd_rest.clients("channel") == 1)
+
+    deadline = time.monotonic() + 15.0
+    while len(events_at_recompute) < 2 and time.monotonic() < deadline:
+        lnd_rest.publish("channel")
+        time.sleep(0.05)
+    lnd_rest.publish("channel")
+    assert _wait(lambda: r.state()["sources"][name]["events"] > events_at_recompute[-1])
+
+    # Recalculou duas vezes com a rajada ainda chegando
+    assert len(events_at_recompute) >= 2
+    assert events_at_recompute[0] < events_at_recompute[1] < r.state()["sources"][name]["events"]
+    state = r.state()
+    assert state["sources"][name]["status"] == "connected"
+    assert state["sections"]["lnd"]["refreshes"] == len(events_at_recompute)
+
+
+def test_recompute_is_not_held_back_by_invalidate_only_burst(refresher, lnd_rest):
+    # A invalidação pendente só venceria em 60s; o evento de canal tem que
+    # rodar no debounce dele
+    r = refresher(debounce=0.2, max_delay=60.0)
+    invalidations = []
+    recompute = Counter({"channels": 1})
+    r.add_section("lnd", lambda: invalidations.append(time.monotonic()), recompute)
+    r.subscribe_lnd_stream(lnd_rest.url, "/v1/channels/subscribe", ["lnd"])
+    r.subscribe_lnd_stream(lnd_rest.url, "/v2/router/htlcevents", ["lnd"], recompute=False, debounce=60.0)
+    r.start()
+    assert _wait(lambda: lnd_rest.clients("channel") == 1 and lnd_rest.clients("htlc") == 1)
+
+    for _ in range(20):
+        lnd_rest.publish("htlc")
+    assert _wait(lambda: r.state()["sources"]["lnd:/v2/router/htlcevents"]["events"] == 20)
+    assert recompute.calls == []
+    assert _section(r, "lnd")["pending"]
+
+    lnd_rest.publish("channel")
+    assert _wait(lambda: recompute.calls, timeout=15.0)
+
+    section = _section(r, "lnd")
+    assert section["refreshes"] == 1
+    assert len(invalidations) == 1
+    assert section["last_reasons"] == ["lnd:/v1/channels/subscribe", "lnd:/v2/router/htlcevents"]
+    assert not section["pending"]
+
+
+def test_invalidate_only_burst_does_not_delay_pending_recompute(refresher, lnd_rest):
+    # Cada HTLC adiaria o recálculo até max_delay (60s) se estendesse o prazo
+    r = refresher(debounce=0.5, max_delay=60.0)
+    htlc = "lnd:/v2/router/htlcevents"
+    htlc_at_recompute = []
+    r.add_section("lnd", lambda: None,
+                  lambda: htlc_at_recompute.append(r.state()["sources"][htlc]["events"]) or {"channels": 1})
+    r.subscribe_lnd_stream(lnd_rest.url, "/v1/channels/subscribe", ["lnd"])
+    r.subscribe_lnd_stream(lnd_rest.url, "/v2/router/htlcevents", ["lnd"], recompute=False, debounce=0.5)
+    r.start()
+    assert _wait(lambda: lnd_rest.clients("channel") == 1 and lnd_rest.clients("htlc") == 1)
+
+    lnd_rest.publish("channel")
+    deadline = time.monotonic() + 15.0
+    while not htlc_at_recompute and time.monotonic() < deadline:
+        lnd_rest.publish("htlc")
+        time.sleep(0.02)
+
+    # Rodou no meio da rajada de HTLCs, não depois dela
+    assert htlc_at_recompute
+    assert htlc_at_recompute[0] > 0
+    assert _section(r, "lnd")["refreshes"] == 1
+
+
+def test_fallback_queues_recompute_without_events(refresher):
+    r = refresher(debounce=0.05)
+    polled = Counter({"height": 1})
+    never = Counter()
+    r.add_section("bitcoin", lambda: None, polled, fallback=0.2)
+    r.add_section("message", lambda: None, never)
+    r.start()
+
+    assert _wait(lambda: r.state()["stats"]["fallbacks"] >= 3, timeout=15.0)
+    r.stop()
+    assert _wait(lambda: _section(r, "bitcoin")["refreshes"] == r.state()["stats"]["fallbacks"])
+    state = r.state()
+    assert state["stats"]["notifications"] == 0
+    assert len(polled.calls) == state["stats"]["fallbacks"]
+    assert state["sections"]["bitcoin"]["last_reasons"] == ["fallback"]
+    assert state["sections"]["message"]["refreshes"] == 0
+    assert never.calls == []
+
+
+def test_fallback_not_queued_while_event_pending(refresher):
+    # O evento fica pendente (debounce 3s) durante todo o prazo do fallback (1s)
+    r = refresher(debounce=3.0, max_delay=30.0)
+    recompute = Counter({"height": 1})
+    r.add_section("bitcoin", lambda: None, recompute, fallback=1.0)
+    r.notify(["bitcoin"], "test")
+    r.start()
+
+    assert _wait(lambda: _section(r, "bitcoin")["refreshes"] == 1, timeout=15.0)
+    state = r.state()
+    assert state["stats"]["fallbacks"] == 0
+    assert state["sections"]["bitcoin"]["last_reasons"] == ["test"]
+    assert len(recompute.calls) == 1
+
+
+def test_version_changes_only_when_content_changes(refresher, tmp_path):
+    message = tmp_path / "message.txt"
+    message.write_text("hello\n")
+    r = refresher(debounce=0.05)
+    r.add_section("message", lambda: None, lambda: message.read_text())
+    r.watch_files({str(message): ["message"]}, interval=0.02)
+    r.start()
+    assert _wait(lambda: r.state()["sources"]["files"]["status"] == "watching")
+
+    def touch_and_wait(expected_refreshes):
+        # mtime em ns pode não mudar entre dois touch seguidos em alguns FS
+        time.sleep(0.05)
+        touch(message)
+        assert _wait(lambda: _section(r, "message")["refreshes"] == expected_refreshes)
+
+    touch_and_wait(1)
+    assert _section(r, "message")["version"] == 1
+    touch_and_wait(2)
+    touch_and_wait(3)
+    assert _section(r, "message")["version"] == 1
+
+    time.sleep(0.05)
+    message.write_text("changed\n")
+    assert _wait(lambda: _section(r, "message")["refreshes"] == 4)
+    section = _section(r, "message")
+    assert section["version"] == 2
+    assert section["last_reasons"] == ["file:message.txt"]
+    assert r.state()["sources"]["files"]["events"] == 4
+
+
+def test_silent_lnd_stream_is_not_a_disconnect(refresher, lnd_rest):
+    r = refresher(debounce=0.05)
+    recompute = Counter({"channels": 1})
+    r.add_section("lnd", lambda: None, recompute)
+    r.subscribe_lnd_stream(lnd_rest.url, "/v1/channels/subscribe", ["lnd"], read_timeout=0.3)
+    r.start()
+    name = "lnd:/v1/channels/subscribe"
+    status = lambda: r.state()["sources"][name]["status"]  # noqa: E731
+
+    # Stream mudo com read_timeout: fica stale e reconecta, duas vezes, sem notificar
+    for _ in range(2):
+        assert _wait(lambda: status() == "connected")
+        assert _wait(lambda: status() == "stale")
+    assert _wait(lambda: status() == "connected")
+    state = r.state()
+    assert state["stats"]["notifications"] == 0
+    assert state["sections"]["lnd"]["refreshes"] == 0
+    assert recompute.calls == []
+
+
+def test_reconnect_after_drop_notifies_with_source_settings(refresher, lnd_rest):
+    r = refresher(debounce=0.05)
+    lnd_recompute = Counter({"channels": 1})
+    peers_invalidated = []
+    r.add_section("lnd", lambda: None, lnd_recompute)
+    r.add_section("top_peers", lambda: peers_invalidated.append(1), Counter({"peers": 1}))
+    r.subscribe_lnd_stream(lnd_rest.url, "/v1/channels/subscribe", ["lnd"])
+    r.subscribe_lnd_stream(lnd_rest.url, "/v2/router/htlcevents", ["top_peers"], recompute=False)
+    r.start()
+    channels, htlc = "lnd:/v1/channels/subscribe", "lnd:/v2/router/htlcevents"
+    assert _wait(lambda: lnd_rest.clients("channel") == 1 and lnd_rest.clients("htlc") == 1)
+
+    lnd_rest.disconnect()
+    assert _wait(lambda: _section(r, "lnd")["last_reasons"] == [f"{channels}:reconnect"])
+    assert _wait(lambda: _section(r, "top_peers")["last_reasons"] == [f"{htlc}:reconnect"])
+
+    state = r.state()
+    assert state["sources"][channels]["status"] == "connected"
+    assert state["sources"][htlc]["status"] == "connected"
+    assert len(lnd_recompute.calls) == 1
+    # Fonte só de invalidação continua só invalidando na reconexão
+    assert state["stats"]["recomputes"] == 1
+    assert len(peers_invalidated) == 1